@@ -0,0 +1,77 @@
+# Giải mã IMA-ADPCM dạng khối từ server (profile codec "adpcm" trong webserver/profiles.py)
+# Mỗi khối: 2 byte mẫu dự đoán (int16 LE), 1 byte chỉ số bước, 1 byte dự phòng,
+# sau đó là các mẫu 4 bit, mẫu đầu ở nửa byte cao.
+# Bộ đệm cấp phát một lần, giải mã bằng viper nên không tạo rác trong vòng phát.
+import micropython
+from array import array
+
+_STEPS = array('H', (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+))
+
+
+@micropython.viper
+def _decode_block(src: ptr8, nbytes: int, dst: ptr16, steps: ptr16) -> int:
+    predicted = src[0] | (src[1] << 8)
+    if predicted & 0x8000:
+        predicted -= 0x10000
+    index = src[2]
+    j = 0
+    i = 4
+    while i < nbytes:
+        byte = src[i]
+        k = 0
+        while k < 2:
+            if k == 0:
+                delta = byte >> 4
+            else:
+                delta = byte & 0x0F
+            step = steps[index]
+            vpdiff = step >> 3
+            if delta & 4:
+                vpdiff += step
+            if delta & 2:
+                vpdiff += step >> 1
+            if delta & 1:
+                vpdiff += step >> 2
+            if delta & 8:
+                predicted -= vpdiff
+                if predicted < -32768:
+                    predicted = -32768
+            else:
+                predicted += vpdiff
+                if predicted > 32767:
+                    predicted = 32767
+            if delta & 4:
+                index += ((delta & 3) + 1) * 2
+                if index > 88:
+                    index = 88
+            else:
+                index -= 1
+                if index < 0:
+                    index = 0
+            dst[j] = predicted
+            j += 1
+            k += 1
+        i += 1
+    return j
+
+
+class AdpcmDecoder:
+    def __init__(self, block_bytes):
+        # block_bytes do server báo trong /register_profile (4 + số mẫu / 2)
+        self.block = bytearray(block_bytes)
+        self.pcm = bytearray((block_bytes - 4) * 4)
+
+    def read_block(self, stream):
+        # Đọc trọn một khối từ stream (HttpStream.readinto), giải mã vào self.pcm.
+        # Trả về số byte PCM, 0 khi hết dữ liệu.
+        if stream.readinto(self.block) < len(self.block):
+            return 0
+        return _decode_block(self.block, len(self.block), self.pcm, _STEPS) * 2
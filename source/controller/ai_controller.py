@@ -1,8 +1,9 @@
-import network, socket, time, ujson, os
+import network, socket, time, ujson, os, ubinascii, struct
 from machine import Pin, I2S, reset
 from ws2812 import leds      # Giả sử bạn đã có class WS2812
 import espnow
 import urequests
+from voice_link import VoiceLink, AUDIO, END, EVENT
 
 class ESP32MicStreamer:
     def __init__(self):
@@ -25,8 +26,17 @@ class ESP32MicStreamer:
         self.button = Pin(12, Pin.IN, Pin.PULL_UP)
         self.SERVER_IP = "192.168.1.100"
         self.SERVER_PORT = 8000
+        self.VOICE_PORT = 8001
+        # "voice": kênh thoại TCP giữ kết nối giữa các lượt nói (voice_link.py)
+        # "stream": cả lượt nói gửi trong một kết nối tới /stream_audio
+        # "chunks": mỗi 16000 byte một POST /send_audio_chunk rồi POST /end_audio như cũ
+        self.UPLOAD_MODE = "voice"
+        self.link = None
+        self.frame_head = bytearray(6)  # số thứ tự (uint32 LE) + độ dài (uint16 LE)
 
         self.rb_mac = b'\xcc\xba\x97\n\xc1\xe8'  # Thay bằng MAC thật
+        # Server tách phiên theo robot: tay cầm gửi âm thanh thay cho robot đã ghép cặp
+        self.DEVICE_ID = ubinascii.hexlify(self.rb_mac).decode()
 
         self.wlan = network.WLAN(network.STA_IF)
         self.wlan.active(True)
@@ -147,7 +157,7 @@ class ESP32MicStreamer:
         print("Bắt đầu stream audio")
         url_chunk = f"http://{self.SERVER_IP}:{self.SERVER_PORT}/send_audio_chunk"
         url_end = f"http://{self.SERVER_IP}:{self.SERVER_PORT}/end_audio"
-        headers = {'Content-Type': 'application/octet-stream'}
+        headers = {'Content-Type': 'application/octet-stream', 'X-Device-Id': self.DEVICE_ID}
 
         chunk_buffer = bytearray()
 
@@ -179,7 +189,7 @@ class ESP32MicStreamer:
 
             # Gửi tín hiệu báo đã kết thúc gửi audio
             try:
-                response = urequests.post(url_end)
+                response = urequests.post(url_end, headers={'X-Device-Id': self.DEVICE_ID})
                 response.close()
                 print("🛑 Đã gửi tín hiệu kết thúc gửi audio")
             except Exception as e:
@@ -192,6 +202,72 @@ class ESP32MicStreamer:
             
         
             
+    def write_frame(self, sock, seq, data):
+        # Mỗi khung là một chunk HTTP: độ dài (hex), header 6 byte, rồi PCM
+        sock.write(("%x\r\n" % (len(data) + 6)).encode())
+        struct.pack_into("<IH", self.frame_head, 0, seq, len(data))
+        sock.write(self.frame_head)
+        sock.write(data)
+        sock.write(b"\r\n")
+
+    def stream_audio_chunked(self):
+        # Một kết nối cho cả lượt nói: đọc mic vào bộ đệm cố định rồi gửi ngay từng khung
+        # có số thứ tự, không phải bắt tay TCP lại mỗi 16000 byte nên mic được đọc liên tục
+        print("Bắt đầu stream audio (một kết nối)")
+        buf = bytearray(self.BUFFER_SIZE)
+        mv = memoryview(buf)
+        seq = 0
+        sock = None
+        try:
+            addr = socket.getaddrinfo(self.SERVER_IP, self.SERVER_PORT)[0][-1]
+            sock = socket.socket()
+            sock.connect(addr)
+            sock.write(("POST /stream_audio HTTP/1.1\r\nHost: %s\r\nX-Device-Id: %s\r\n"
+                        "Content-Type: application/octet-stream\r\nTransfer-Encoding: chunked\r\n"
+                        "Connection: close\r\n\r\n") % (self.SERVER_IP, self.DEVICE_ID))
+
+            while self.button.value() == 0:  # giữ nút
+                num_bytes = self.audio_in.readinto(buf)
+                if num_bytes > 0:
+                    self.write_frame(sock, seq, mv[:num_bytes])
+                    seq += 1
+
+            # Nút nhả ra: khung độ dài 0 báo hết câu nói, rồi kết thúc body chunked
+            self.write_frame(sock, seq, mv[:0])
+            sock.write(b"0\r\n\r\n")
+            status = sock.readline()
+            print(f"🛑 Đã gửi {seq} khung audio, server trả về:", status)
+        except Exception as e:
+            print("❌ Stream audio thất bại:", e)
+        finally:
+            if sock:
+                sock.close()
+
+    def stream_audio_voice(self):
+        # Kết nối được giữ qua các lượt nói, mỗi lần đọc mic là một khung AUDIO,
+        # nhả nút thì gửi END và nhận lại sự kiện server đã nhận lượt nói
+        print("Bắt đầu stream audio (kênh thoại)")
+        if self.link is None:
+            self.link = VoiceLink(self.SERVER_IP, self.VOICE_PORT, self.DEVICE_ID, mic=True)
+        buf = bytearray(self.BUFFER_SIZE)
+        mv = memoryview(buf)
+        try:
+            if not self.link.connected():
+                self.link.connect()
+            while self.button.value() == 0:  # giữ nút
+                num_bytes = self.audio_in.readinto(buf)
+                if num_bytes > 0:
+                    self.link.send(AUDIO, mv[:num_bytes])
+            self.link.send(END)
+            kind, length = self.link.recv_header(2000)
+            if kind == EVENT:
+                print("🛑 Kết thúc stream audio:", self.link.read_json(length))
+            elif kind is not None:
+                self.link.skip(length)
+        except Exception as e:
+            print("❌ Kênh thoại lỗi, sẽ kết nối lại ở lượt sau:", e)
+            self.link.close()
+
     def connect(self):
         if self.CRED_FILE in os.listdir():
             if self.connect_wifi_from_file():
@@ -223,6 +299,11 @@ class ESP32MicStreamer:
         if self.STATE == "STREAM":
             if self.button.value() == 0: # Nút được nhấn (kéo xuống đất)
                 print("▶️ Nút được nhấn, bắt đầu stream.")
-                self.stream_audio()
+                if self.UPLOAD_MODE == "voice":
+                    self.stream_audio_voice()
+                elif self.UPLOAD_MODE == "stream":
+                    self.stream_audio_chunked()
+                else:
+                    self.stream_audio()
                     
 app = ESP32MicStreamer()
\ No newline at end of file
@@ -1,6 +1,9 @@
-import network, socket, time, ujson, os
+import network, socket, time, ujson, os, ubinascii
 from machine import Pin, I2S, reset
 import urequests
+from http_stream import HttpStream
+from adpcm import AdpcmDecoder
+from voice_link import VoiceLink, EVENT, REPLY_AUDIO, REPLY_END
 
 class AiRobot:
     def __init__(self, i2s):
@@ -10,11 +13,26 @@ class AiRobot:
 
         self.SERVER_IP = "192.168.1.100"  # Địa chỉ web server
         self.SERVER_PORT = 8000
+        # Thời gian server giữ kết nối chờ phản hồi (giây), ngắn để vẫn kịp nhận lệnh đổi mode
+        self.WAIT_TIMEOUT = 5
+        # Nhận âm thanh nén IMA-ADPCM (ít hơn 4 lần số byte qua WiFi), giải mã ngay trên ESP32
+        self.USE_ADPCM = True
+        self.decoder = None
+        # Nhận phản hồi qua kênh thoại TCP (một kết nối giữ suốt) thay cho long-poll HTTP
+        self.USE_VOICE_LINK = True
+        self.VOICE_PORT = 8001
+        self.link = None
 
+        # Phải khớp với I2S khởi tạo trong main.py (16 kHz, ibuf=4096)
+        self.SAMPLE_RATE = 16000
+        self.BUFFER_SIZE = 4096
         self.audio_out = i2s
         self.i2s_initialized = True
         self.wlan = network.WLAN(network.STA_IF)
         self.wlan.active(True)
+        # Mã thiết bị (MAC WiFi) để server tách phiên cho từng robot
+        self.DEVICE_ID = ubinascii.hexlify(self.wlan.config('mac')).decode()
+        self.HEADERS = {'X-Device-Id': self.DEVICE_ID}
 
     def url_decode(self, s):
         s = s.replace('+', ' ')
@@ -118,33 +136,134 @@ class AiRobot:
             print("⚠️ Không tìm thấy file wifi.json")
             return False
 
-    def stream_audio_from_web(self):
-        url_check = f"http://{self.SERVER_IP}:{self.SERVER_PORT}/get_ready"
-        url_audio = f"http://{self.SERVER_IP}:{self.SERVER_PORT}/get_audio_response"
-        url_done = f"http://{self.SERVER_IP}:{self.SERVER_PORT}/end_audio"
-        res = urequests.get(url_check)
-        status = ujson.loads(res.text)
-        res.close()
-        if status.get("ready") == 1:
-            print("🎵 Server sẵn sàng, tải âm thanh...")
-            audio_res = urequests.get(url_audio, stream=True)
+    def output_profile(self):
+        # Định dạng I2S của loa: server gửi đúng tần số/số bit và mỗi chunk dài đúng ibuf,
+        # nên dữ liệu nhận được ghi thẳng vào I2S không phải chuyển đổi
+        profile = {"rate": self.SAMPLE_RATE, "bits": 16, "align": self.BUFFER_SIZE}
+        if self.USE_ADPCM:
+            profile["codec"] = "adpcm"
+        return profile
+
+    def apply_profile(self, registered):
+        if registered.get("codec") == "adpcm":
+            # Mỗi khối ADPCM giải mã ra đúng BUFFER_SIZE byte PCM cho một lần ghi I2S
+            self.decoder = AdpcmDecoder(registered["block_bytes"])
+        else:
+            self.decoder = None
+
+    def register_profile(self):
+        try:
+            res = urequests.post(f"http://{self.SERVER_IP}:{self.SERVER_PORT}/register_profile",
+                                 json=self.output_profile(), headers=self.HEADERS)
+            registered = res.json()
+            res.close()
+            self.apply_profile(registered)
+        except Exception as e:
+            print("⚠️ Không đăng ký được định dạng âm thanh:", e)
+
+    def play_from_link(self):
+        # Chờ phản hồi trên kênh thoại tối đa WAIT_TIMEOUT giây rồi trả về để vòng lặp chính
+        # vẫn kịp xử lý việc khác, giống long-poll nhưng không mở kết nối mới mỗi lần
+        if self.link is None:
+            self.link = VoiceLink(self.SERVER_IP, self.VOICE_PORT, self.DEVICE_ID,
+                                  speaker=True, profile=self.output_profile())
+            self.play_buf = bytearray(self.BUFFER_SIZE)
+        try:
+            if not self.link.connected():
+                self.link.connect()
+                self.apply_profile(self.link.profile)
+            kind, length = self.link.recv_header(self.WAIT_TIMEOUT * 1000)
+            if kind is None:
+                return False
+            if kind != EVENT:
+                self.link.skip(length)
+                return False
+            event = self.link.read_json(length)
+            if event.get("event") != "reply":
+                return False
+            if event.get("action"):
+                # Lệnh cho robot (nhảy, hát, di chuyển): không có âm thanh, chỉ còn khung REPLY_END
+                kind, length = self.link.recv_header()
+                self.link.skip(length)
+                print("🤖 Lệnh từ server:", event["action"])
+                return event["action"]
+
+            print("🎵 Có phản hồi, đang phát âm thanh...")
+            adpcm = event["profile"].get("codec") == "adpcm"
+            mv = memoryview(self.play_buf)
             while True:
-                chunk = audio_res.raw.read(4096)
-                if not chunk:
+                kind, length = self.link.recv_header()
+                if kind == REPLY_END:
+                    self.link.skip(length)
                     break
-                self.audio_out.write(chunk)
+                if kind != REPLY_AUDIO:
+                    self.link.skip(length)
+                    continue
+                if adpcm:
+                    # Khung luôn là nguyên khối ADPCM, giải mã từng khối rồi ghi vào I2S
+                    block = len(self.decoder.block)
+                    while length >= block:
+                        self.decoder.read_block(self.link)
+                        self.audio_out.write(self.decoder.pcm)
+                        length -= block
+                    self.link.skip(length)
+                else:
+                    while length:
+                        n = min(length, self.BUFFER_SIZE)
+                        self.link.readinto(mv[:n])
+                        self.audio_out.write(mv[:n])
+                        length -= n
+            print("🔊 Đã phát xong audio")
+            return False
+        except Exception as e:
+            print("❌ Kênh thoại lỗi, sẽ kết nối lại:", e)
+            self.link.close()
+            return False
+
+    def play_response(self):
+        # Trả về mã hành động nếu server trả lời bằng lệnh cho robot (DANCE, PLAY:<file>,
+        # MOVE:f|b|l|r, STOP), ngược lại False; main.py thực hiện lệnh bằng Robot/AudioPlayer
+        if self.USE_VOICE_LINK:
+            return self.play_from_link()
+        return self.stream_audio_from_web()
+
+    def stream_audio_from_web(self):
+        # Long-poll: server giữ kết nối tới khi có phản hồi rồi gửi PCM thô bằng HTTP chunked
+        # ngay khi từng câu được tổng hợp, nên câu đầu được phát trong lúc các câu sau
+        # còn đang được tạo
+        audio_res = HttpStream(self.SERVER_IP, self.SERVER_PORT,
+                               f"stream_response?timeout={self.WAIT_TIMEOUT}", self.HEADERS)
+        if audio_res.status_code == 200:
+            action = audio_res.headers.get("x-robot-action")
+            if action:
+                audio_res.close()
+                print("🤖 Lệnh từ server:", action)
+                return action
+            print("🎵 Có phản hồi, đang phát âm thanh...")
+            if self.decoder and audio_res.headers.get("content-type", "").startswith("audio/x-ima-adpcm"):
+                # Đọc từng khối ADPCM vào bộ đệm có sẵn, giải mã rồi ghi thẳng vào I2S
+                while self.decoder.read_block(audio_res):
+                    self.audio_out.write(self.decoder.pcm)
+            else:
+                while True:
+                    chunk = audio_res.read(self.BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    self.audio_out.write(chunk)
             audio_res.close()
             print("🔊 Đã phát xong audio")
             return False
         else:
-            print("🎵 Server không sẵn sàng")
+            audio_res.close()
+            print("🎵 Server chưa có phản hồi")
             return False
-        self.audio_out.deinit()
 
     def connect(self):
         if self.CRED_FILE in os.listdir():
             if self.connect_wifi_from_file():
                 self.STATE = "STREAM"
+                if not self.USE_VOICE_LINK:
+                    self.register_profile()
             else:
                 self.STATE = "CONFIG"
         else:
@@ -168,4 +287,4 @@ class AiRobot:
 
     def run(self):
         if self.STATE == "STREAM":
-            self.stream_audio_from_web()
+            self.play_response()
@@ -162,6 +162,21 @@ def mode_2_learn():
                 print("Lỗi decode file id học:", msg, e)
 
 
+def run_action(action):
+    # Lệnh server nhận ra từ câu nói của bé, robot tự làm không cần âm thanh phản hồi
+    print("[MODE 3] Thực hiện lệnh:", action)
+    if action == 'DANCE':
+        asyncio.run(robot.dance_async())
+    elif action.startswith('PLAY:'):
+        asyncio.run(audio.play_wav(action[5:] + ".wav"))
+    elif action.startswith('MOVE:'):
+        robot.move(action[5:])
+    elif action == 'STOP':
+        robot.stop()
+    else:
+        print("Lệnh không hỗ trợ, bỏ qua:", action)
+
+
 def mode_3_ai():
     display.show_emotion("NEUTRAL")
     asyncio.run(audio.play_wav("MODE3.wav"))
@@ -201,8 +216,10 @@ def mode_3_ai():
                         mode_4_khac()
                         return
             else:
-                # Không có dữ liệu từ ESP => gọi phát âm thanh
-                app.stream_audio_from_web()
+                # Không có dữ liệu từ ESP => gọi phát âm thanh, hoặc thực hiện lệnh server trả về
+                action = app.play_response()
+                if action:
+                    run_action(action)
 
         except Exception as e:
             print("[ERROR] Trong vòng lặp mode 3:", e)
@@ -1,4 +1,4 @@
-import network, time, ujson
+import network, time, ujson, ubinascii
 import espnow
 import urequests
 from machine import I2S, Pin, reset
@@ -9,6 +9,8 @@ class WiFiSlave:
         self.controller_mac = controller_mac
         self.wlan = network.WLAN(network.STA_IF)
         self.wlan.active(True)
+        # Mã thiết bị (MAC WiFi) để server tách phiên cho từng thiết bị
+        self.headers = {'X-Device-Id': ubinascii.hexlify(self.wlan.config('mac')).decode()}
 
         self.e = espnow.ESPNow()
         self.e.active(True)
@@ -46,21 +48,23 @@ class WiFiSlave:
         with open(self.cred_file, "w") as f:
             f.write(ujson.dumps(creds))
 
-    def check_ready(self):
+    def wait_and_play_audio(self, timeout=20):
+        # Long-poll: server giữ kết nối tới khi có phản hồi rồi trả luôn âm thanh trong cùng response
         try:
-            response = urequests.get(self.get_url("get_ready"))
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('ready', 0)
-            return 0
-        except Exception as e:
-            print(f"❌ ESP2: Lỗi khi kiểm tra ready: {e}")
-            return 0
-
-    def receive_and_play_audio(self):
-        print("📥 ESP2: Đang tải âm thanh...")
-        try:
-            response = urequests.get(self.get_url("receive_audio"), stream=True)
+            response = urequests.get(self.get_url(f"wait_response?timeout={timeout}"),
+                                     headers=self.headers, stream=True)
+            if response.status_code != 200:
+                response.close()
+                return False
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            # Phản hồi là lệnh cho robot (nhảy, di chuyển...): không có âm thanh để phát
+            if headers.get("x-robot-action") or headers.get("content-length") == "0":
+                response.close()
+                return False
+            print("📥 ESP2: Đang phát âm thanh...")
+            chunk = response.raw.read(44)
+            if chunk[:4] != b"RIFF":
+                self.audio_out.write(chunk)  # PCM thô, không có header WAV để bỏ qua
             while True:
                 chunk = response.raw.read(1024)
                 if not chunk:
@@ -68,15 +72,16 @@ class WiFiSlave:
                 self.audio_out.write(chunk)
             response.close()
             print("✅ ESP2: Phát âm thanh hoàn tất!")
+            return True
         except Exception as e:
             print(f"❌ ESP2: Lỗi khi tải/phát âm thanh: {e}")
+            time.sleep(1)
+            return False
 
     def run_main_loop(self):
         print("🔁 Bắt đầu vòng lặp chính...")
         while True:
-            if self.check_ready():
-                self.receive_and_play_audio()
-            time.sleep(1)
+            self.wait_and_play_audio()
 
     def listen_for_config(self):
         while True:
@@ -0,0 +1,79 @@
+# GET HTTP đơn giản để đọc dần body từ server, hỗ trợ cả response dạng chunked
+# (urequests báo lỗi với response chunked nên không dùng được cho âm thanh streaming)
+import socket
+
+
+class HttpStream:
+    def __init__(self, host, port, path, headers=None):
+        addr = socket.getaddrinfo(host, port)[0][-1]
+        self.sock = socket.socket()
+        self.sock.connect(addr)
+        req = "GET /%s HTTP/1.1\r\nHost: %s\r\nConnection: close\r\n" % (path, host)
+        for k in headers or {}:
+            req += "%s: %s\r\n" % (k, headers[k])
+        self.sock.write(req + "\r\n")
+
+        # Dòng trạng thái, ví dụ: HTTP/1.1 200 OK
+        self.status_code = int(self.sock.readline().split(None, 2)[1])
+        self.chunked = False
+        self.headers = {}
+        while True:
+            line = self.sock.readline()
+            if not line or line == b"\r\n":
+                break
+            k, v = line.decode().split(":", 1)
+            k = k.strip().lower()
+            self.headers[k] = v.strip()
+            if k == "transfer-encoding" and "chunked" in v:
+                self.chunked = True
+        self._left = 0    # số byte còn lại của chunk hiện tại
+        self._eof = False
+
+    def _next_chunk(self):
+        # Mỗi chunk bắt đầu bằng độ dài dạng hex, chunk độ dài 0 là kết thúc
+        size = int(self.sock.readline().split(b";")[0].strip(), 16)
+        if size == 0:
+            self._eof = True
+        self._left = size
+
+    def read(self, n):
+        if not self.chunked:
+            return self.sock.read(n)
+        if self._eof:
+            return b""
+        if self._left == 0:
+            self._next_chunk()
+            if self._eof:
+                return b""
+        data = self.sock.read(min(n, self._left))
+        self._left -= len(data)
+        if self._left == 0:
+            self.sock.read(2)  # bỏ \r\n cuối chunk
+        return data
+
+    def readinto(self, buf):
+        # Đọc cho đầy buf (trừ khi hết dữ liệu) mà không cấp phát bộ đệm mới
+        mv = memoryview(buf)
+        got = 0
+        while got < len(buf):
+            if self.chunked:
+                if self._eof:
+                    break
+                if self._left == 0:
+                    self._next_chunk()
+                    continue
+                n = self.sock.readinto(mv[got:got + min(len(buf) - got, self._left)])
+                if not n:
+                    break
+                self._left -= n
+                if self._left == 0:
+                    self.sock.read(2)  # bỏ \r\n cuối chunk
+            else:
+                n = self.sock.readinto(mv[got:])
+                if not n:
+                    break
+            got += n
+        return got
+
+    def close(self):
+        self.sock.close()
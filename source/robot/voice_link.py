@@ -0,0 +1,98 @@
+# Client kênh thoại TCP tới server (webserver/voice_channel.py): giữ một kết nối suốt,
+# gửi âm thanh micro và lệnh, nhận sự kiện và âm thanh phản hồi trên cùng socket.
+# Mỗi khung: 1 byte loại + 2 byte độ dài (uint16 LE) + dữ liệu
+import socket, struct, ujson, select
+
+# Thiết bị -> server
+HELLO = 0x01
+AUDIO = 0x02
+END = 0x03
+RESET = 0x04
+PING = 0x05
+# Server -> thiết bị
+EVENT = 0x81
+REPLY_AUDIO = 0x82
+REPLY_END = 0x83
+PONG = 0x85
+
+
+class VoiceLink:
+    def __init__(self, host, port, device_id, mic=False, speaker=False, profile=None):
+        self.host = host
+        self.port = port
+        self.device_id = device_id
+        self.mic = mic
+        self.speaker = speaker
+        self.requested_profile = profile
+        self.profile = None      # định dạng server xác nhận khi bắt tay
+        self.sock = None
+        self.poller = None
+        self.out_head = bytearray(3)
+        self.in_head = bytearray(3)
+        self.skip_buf = bytearray(256)
+
+    def connected(self):
+        return self.sock is not None
+
+    def connect(self):
+        addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        self.sock = socket.socket()
+        self.sock.connect(addr)
+        self.poller = select.poll()
+        self.poller.register(self.sock, select.POLLIN)
+        hello = {"device": self.device_id, "mic": self.mic, "speaker": self.speaker}
+        if self.requested_profile:
+            hello["profile"] = self.requested_profile
+        self.send(HELLO, ujson.dumps(hello).encode())
+        kind, length = self.recv_header()
+        event = self.read_json(length) if kind == EVENT else {}
+        if event.get("event") != "hello":
+            self.close()
+            raise OSError("Server từ chối kênh thoại: %s" % event)
+        self.profile = event.get("profile")
+        print("🔗 Đã kết nối kênh thoại")
+
+    def send(self, kind, data=b""):
+        struct.pack_into("<BH", self.out_head, 0, kind, len(data))
+        self.sock.write(self.out_head)
+        if data:
+            self.sock.write(data)
+
+    def readinto(self, buf):
+        # Đọc cho đầy buf, báo lỗi nếu server đóng kết nối giữa chừng
+        mv = memoryview(buf)
+        got = 0
+        while got < len(buf):
+            n = self.sock.readinto(mv[got:])
+            if not n:
+                raise OSError("Kênh thoại đã đóng")
+            got += n
+        return got
+
+    def recv_header(self, timeout_ms=-1):
+        # Chờ khung tiếp theo, trả về (loại, độ dài) hoặc (None, 0) nếu hết thời gian chờ
+        if timeout_ms >= 0 and not self.poller.poll(timeout_ms):
+            return None, 0
+        self.readinto(self.in_head)
+        return struct.unpack("<BH", self.in_head)
+
+    def read_json(self, length):
+        buf = bytearray(length)
+        self.readinto(buf)
+        return ujson.loads(buf)
+
+    def skip(self, length):
+        mv = memoryview(self.skip_buf)
+        while length:
+            n = min(length, len(self.skip_buf))
+            self.readinto(mv[:n])
+            length -= n
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.poller = None
@@ -0,0 +1,110 @@
+# Mã hóa IMA-ADPCM 4 bit (nén 4:1) cho âm thanh gửi xuống robot, chia thành các khối độc lập
+# Mỗi khối: 2 byte mẫu dự đoán (int16 LE), 1 byte chỉ số bước, 1 byte dự phòng (0),
+# sau đó là samples_per_block mẫu 4 bit, mẫu đầu ở nửa byte cao (giống audioop).
+# Bộ giải mã tương ứng trên ESP32: robot/adpcm.py và controller/adpcm.py
+import struct
+import warnings
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop  # bản C trong thư viện chuẩn (bỏ ở Python 3.13, có gói audioop-lts)
+except ImportError:
+    audioop = None
+
+HEADER = 4
+
+INDEX_TABLE = (-1, -1, -1, -1, 2, 4, 6, 8) * 2
+
+STEP_TABLE = (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+)
+
+
+def block_bytes(samples_per_block):
+    return HEADER + samples_per_block // 2
+
+
+def _encode(pcm, state):
+    # Bản Python thuần, cho kết quả giống hệt audioop.lin2adpcm
+    predicted, index = state
+    out = bytearray(len(pcm) // 4)
+    high = True
+    i = 0
+    for (sample,) in struct.iter_unpack("<h", pcm):
+        step = STEP_TABLE[index]
+        diff = sample - predicted
+        sign = 8 if diff < 0 else 0
+        if sign:
+            diff = -diff
+        delta = 0
+        vpdiff = step >> 3
+        if diff >= step:
+            delta = 4
+            diff -= step
+            vpdiff += step
+        step >>= 1
+        if diff >= step:
+            delta |= 2
+            diff -= step
+            vpdiff += step
+        step >>= 1
+        if diff >= step:
+            delta |= 1
+            vpdiff += step
+        predicted = max(-32768, min(32767, predicted - vpdiff if sign else predicted + vpdiff))
+        delta |= sign
+        index = max(0, min(88, index + INDEX_TABLE[delta]))
+        if high:
+            out[i] = delta << 4
+        else:
+            out[i] |= delta
+            i += 1
+        high = not high
+    return bytes(out), (predicted, index)
+
+
+class BlockEncoder:
+    # Mã hóa dần một luồng PCM int16 mono thành các khối ADPCM. Phần chưa đủ một khối được giữ
+    # lại cho lần sau, chỉ khối cuối cùng của luồng (flush) được đệm im lặng
+    def __init__(self, samples_per_block):
+        self.block_pcm = samples_per_block * 2
+        self.state = (0, 0)
+        self._rest = b""
+
+    def encode(self, pcm):
+        pcm = self._rest + pcm
+        n = len(pcm) - len(pcm) % self.block_pcm
+        self._rest = pcm[n:]
+        return self._blocks(pcm[:n])
+
+    def flush(self):
+        if not self._rest:
+            return b""
+        pcm = self._rest + bytes(self.block_pcm - len(self._rest))
+        self._rest = b""
+        return self._blocks(pcm)
+
+    def _blocks(self, pcm):
+        out = bytearray()
+        for start in range(0, len(pcm), self.block_pcm):
+            out += struct.pack("<hBB", self.state[0], self.state[1], 0)
+            chunk = pcm[start:start + self.block_pcm]
+            if audioop is not None:
+                data, self.state = audioop.lin2adpcm(chunk, 2, self.state)
+            else:
+                data, self.state = _encode(chunk, self.state)
+            out += data
+        return bytes(out)
+
+
+def encode_blocks(pcm, samples_per_block):
+    # Toàn bộ PCM -> các khối ADPCM, khối cuối được đệm im lặng cho đủ mẫu
+    encoder = BlockEncoder(samples_per_block)
+    return encoder.encode(pcm) + encoder.flush()
@@ -0,0 +1,264 @@
+# Nhận diện giọng nói cho ws.py
+# - StreamingTranscriber: âm thanh được giải mã theo từng đoạn trong một luồng nền ngay
+#   khi các chunk còn đang được gửi lên, nên khi /end_audio tới chỉ còn phải giải mã đoạn cuối.
+# - BatchScheduler: gom yêu cầu của nhiều phiên thành batch cho PhoWhisper.
+# - split_long/merge_texts: câu nói dài hơn cửa sổ 30 giây của Whisper được chia thành
+#   nhiều cửa sổ, giải mã chung một batch rồi ghép văn bản.
+import difflib
+import re
+import threading
+import time
+import numpy as np
+
+from config import SAMPLE_RATE
+from pcm_buffer import PcmBuffer
+from metrics import STAGE_SECONDS, ASR_BATCH
+from vad import speech_mask
+
+FRAME = SAMPLE_RATE // 50  # khung 20 ms để tìm chỗ im lặng
+
+
+def pcm16_to_float32(pcm):
+    # PCM int16 little-endian (bytes hoặc view int16) -> mảng float32 trong [-1, 1], không cần file WAV
+    samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+    return samples.astype(np.float32) / 32768.0
+
+
+def quietest_cut(samples, start):
+    # Tìm khung 20 ms có năng lượng thấp nhất từ vị trí start tới cuối
+    # để cắt đoạn mà không cắt ngang một từ
+    tail = samples[start:]
+    n = len(tail) // FRAME
+    if n == 0:
+        return len(samples)
+    frames = tail[:n * FRAME].reshape(n, FRAME)
+    energy = np.square(frames).mean(axis=1)
+    return start + int(np.argmin(energy)) * FRAME + FRAME // 2
+
+
+def split_long(samples, window, overlap, lookback):
+    # Chia âm thanh dài thành các cửa sổ tối đa window mẫu. Ưu tiên cắt ở khoảng lặng (theo VAD)
+    # trong lookback mẫu cuối cửa sổ; nói liền không có chỗ lặng thì cắt cứng và cho cửa sổ sau
+    # lùi lại overlap mẫu để không mất từ bị cắt ngang.
+    # Trả về list (bắt đầu, kết thúc, có chồng lên cửa sổ trước hay không)
+    mask = speech_mask(samples)
+    windows = []
+    start, overlapped = 0, False
+    while len(samples) - start > window:
+        end = start + window
+        lo, hi = (end - lookback) // FRAME, end // FRAME
+        quiet = np.flatnonzero(~mask[lo:hi])
+        if len(quiet):
+            cut = (lo + int(quiet[-1])) * FRAME + FRAME // 2
+            windows.append((start, cut, overlapped))
+            start, overlapped = cut, False
+        else:
+            windows.append((start, end, overlapped))
+            start, overlapped = end - overlap, True
+    windows.append((start, len(samples), overlapped))
+    return windows
+
+
+MERGE_WORDS = 12  # số từ ở mỗi bên chỗ nối được so khớp để bỏ phần lặp
+
+
+def _norm(word):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def merge_texts(texts, overlapped):
+    # Ghép văn bản các cửa sổ; cửa sổ chồng lên cửa sổ trước thì bỏ đoạn từ bị nhận diện hai lần
+    words = []
+    for text, overlap in zip(texts, overlapped):
+        new = text.split()
+        if overlap and words and new:
+            tail = [_norm(w) for w in words[-MERGE_WORDS:]]
+            head = [_norm(w) for w in new[:MERGE_WORDS]]
+            match = difflib.SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(
+                0, len(tail), 0, len(head))
+            # Cần ít nhất 2 từ khớp (hoặc 1 từ nằm ngay đúng chỗ nối) mới coi là phần lặp
+            if match.size >= 2 or (match.size == 1 and match.a + 1 == len(tail) and match.b == 0):
+                del words[len(words) - len(tail) + match.a + match.size:]
+                new = new[match.b + match.size:]
+        words += new
+    return " ".join(words)
+
+
+class StreamingTranscriber:
+    def __init__(self, transcribe, streaming=True, segment_s=2.5, lookback_s=1.0,
+                 max_bytes=120 * SAMPLE_RATE * 2, overflow="drop_oldest"):
+        self.transcribe = transcribe  # hàm: mảng float32 16 kHz -> văn bản
+        self.streaming = streaming
+        self.segment = int(segment_s * SAMPLE_RATE)
+        self.lookback = int(lookback_s * SAMPLE_RATE)
+
+        # Buffer cấp phát trước, có giới hạn (xem pcm_buffer.py)
+        self.audio = PcmBuffer(max_bytes, overflow)
+        self.parts = []        # văn bản của các đoạn đã giải mã xong
+        self.committed = 0     # số mẫu đã được giải mã (tính từ đầu lượt nói)
+        self._wake = threading.Event()
+        self._closed = False
+        self._worker = None
+
+    def __len__(self):
+        return len(self.audio)
+
+    def feed(self, chunk):
+        n = self.audio.write(chunk)
+        self._kick()
+        return n
+
+    def feed_from(self, stream, length=None):
+        # Đọc thẳng body request vào buffer, trả về số byte đã nhận
+        n = self.audio.read_from(stream, length)
+        self._kick()
+        return n
+
+    def tail(self, nbytes):
+        return self.audio.tail(nbytes)
+
+    def _kick(self):
+        if not self.streaming:
+            return
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+        self._wake.set()
+
+    def samples(self):
+        # Toàn bộ âm thanh đã nhận dưới dạng float32
+        with self.audio.lock:
+            return pcm16_to_float32(self.audio.view())
+
+    def _skip_dropped(self):
+        # Phần chưa giải mã đã bị buffer bỏ đi (drop_oldest) thì bỏ qua luôn
+        start, _ = self.audio.span()
+        if self.committed < start:
+            print(f"Buffer âm thanh đầy, bỏ {(start - self.committed) / SAMPLE_RATE:.1f}s chưa nhận diện")
+            self.committed = start
+
+    def partial_text(self):
+        return " ".join(self.parts)
+
+    def _next_segment(self):
+        # Lấy một đoạn đủ dài chưa giải mã, hoặc None nếu chưa đủ dữ liệu
+        with self.audio.lock:
+            self._skip_dropped()
+            _, end = self.audio.span()
+            if end - self.committed < self.segment:
+                return None
+            samples = pcm16_to_float32(self.audio.view(self.committed, self.committed + self.segment))
+        cut = quietest_cut(samples, self.segment - self.lookback)
+        return samples[:cut]
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            while not self._closed:
+                samples = self._next_segment()
+                if samples is None:
+                    break
+                try:
+                    with STAGE_SECONDS.time(stage="asr_segment"):
+                        text = self.transcribe(samples)
+                except Exception as e:
+                    print("Lỗi nhận diện đoạn:", e)
+                    text = ""
+                if text:
+                    self.parts.append(text)
+                    print("Nhận diện tạm:", self.partial_text())
+                self.committed += len(samples)
+
+    def close(self):
+        # Dừng luồng nền, chờ đoạn đang giải mã dở (nếu có)
+        self._closed = True
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join()
+
+    def finish(self):
+        # Dừng luồng nền rồi giải mã phần còn lại
+        self.close()
+        with STAGE_SECONDS.time(stage="wav_assembly"):
+            with self.audio.lock:
+                self._skip_dropped()
+                samples = pcm16_to_float32(self.audio.view(self.committed))
+        if len(samples):
+            text = self.transcribe(samples)
+            if text:
+                self.parts.append(text)
+        return self.partial_text()
+
+
+class BatchScheduler:
+    # Gom các yêu cầu nhận diện tới gần nhau (trong window_s giây hoặc đủ max_batch)
+    # thành một batch để chạy PhoWhisper một lần, chia bớt chi phí encoder cho mỗi câu.
+    # Mọi lời gọi mô hình đều đi qua các luồng của scheduler: một luồng khi chạy trong
+    # tiến trình, hoặc một luồng cho mỗi worker khi dùng AsrProcessPool.
+    def __init__(self, run_batch, window_s=0.05, max_batch=8, workers=1):
+        self.run_batch = run_batch  # hàm: list mảng float32 -> list văn bản
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._pending = []
+        self._cond = threading.Condition()
+        for _ in range(workers):
+            threading.Thread(target=self._run, name="asr-batch", daemon=True).start()
+
+    def transcribe(self, samples):
+        # Gọi từ nhiều luồng, chặn tới khi batch chứa yêu cầu này chạy xong
+        item = _BatchItem(samples)
+        with self._cond:
+            self._pending.append(item)
+            self._cond.notify()
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.text
+
+    def transcribe_many(self, batch):
+        # Đưa cùng lúc nhiều đoạn vào hàng chờ để chúng được giải mã chung một batch
+        items = [_BatchItem(samples) for samples in batch]
+        with self._cond:
+            self._pending += items
+            self._cond.notify_all()
+        for item in items:
+            item.done.wait()
+            if item.error is not None:
+                raise item.error
+        return [item.text for item in items]
+
+    def _next_batch(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending)
+            deadline = time.monotonic() + self.window_s
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            ASR_BATCH.observe(len(batch))
+            try:
+                texts = self.run_batch([item.samples for item in batch])
+                for item, text in zip(batch, texts):
+                    item.text = text
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            for item in batch:
+                item.done.set()
+
+
+class _BatchItem:
+    def __init__(self, samples):
+        self.samples = samples
+        self.text = None
+        self.error = None
+        self.done = threading.Event()
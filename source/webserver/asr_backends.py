@@ -0,0 +1,105 @@
+# Engine nhận diện giọng nói cho ws.py, chọn theo cấu hình ASR_BACKEND
+#   transformers: pipeline PyTorch float32 như trước
+#   onnx: cùng mô hình xuất sang ONNX, lượng tử hóa int8 động, chạy bằng ONNX Runtime trên CPU
+# Cả hai nhận list mảng float32 mono 16 kHz và trả về list văn bản.
+# So sánh độ khớp/độ trễ giữa hai engine: bench_asr.py
+import os
+import shutil
+
+from config import SAMPLE_RATE
+
+
+class TransformersBackend:
+    def __init__(self, model_name="vinai/PhoWhisper-tiny"):
+        self.model_name = model_name
+        self.name = f"transformers-{model_name.rsplit('/', 1)[-1]}"
+        self.pipe = None
+
+    def load(self):
+        from transformers import pipeline
+        self.pipe = pipeline("automatic-speech-recognition", model=self.model_name)
+
+    def transcribe_batch(self, batch):
+        # Đưa thẳng mảng vào pipeline (không qua ffmpeg), pad rồi chạy chung một lần
+        inputs = [{"raw": samples, "sampling_rate": SAMPLE_RATE} for samples in batch]
+        results = self.pipe(inputs, batch_size=len(inputs))
+        return [result["text"].strip() for result in results]
+
+
+class OnnxBackend(TransformersBackend):
+    # Lần đầu chạy sẽ xuất mô hình sang ONNX (optimum) và lượng tử hóa int8 vào model_dir,
+    # các lần sau nạp thẳng từ đó. threads: số luồng ONNX Runtime (0 = mặc định theo số nhân)
+    def __init__(self, model_name="vinai/PhoWhisper-tiny", model_dir="", threads=0):
+        super().__init__(model_name)
+        self.name = f"onnx-int8-{model_name.rsplit('/', 1)[-1]}"
+        self.model_dir = model_dir or os.path.join("onnx", model_name.rsplit("/", 1)[-1])
+        self.threads = threads
+        self._pid = None
+
+    def _export(self):
+        from optimum.onnxruntime import ORTModelForSpeechSeq2Seq, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoProcessor
+
+        fp32_dir = os.path.join(self.model_dir, "fp32")
+        print(f"Xuất {self.model_name} sang ONNX: {fp32_dir}")
+        ORTModelForSpeechSeq2Seq.from_pretrained(self.model_name, export=True).save_pretrained(fp32_dir)
+        AutoProcessor.from_pretrained(self.model_name).save_pretrained(fp32_dir)
+
+        # Lượng tử hóa động: trọng số int8, activation lượng tử hóa lúc chạy nên không cần dữ liệu hiệu chỉnh
+        int8_dir = os.path.join(self.model_dir, "int8")
+        tmp_dir = int8_dir + ".tmp"
+        shutil.copytree(fp32_dir, tmp_dir, ignore=shutil.ignore_patterns("*.onnx", "*.onnx_data"), dirs_exist_ok=True)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        for file_name in sorted(os.listdir(fp32_dir)):
+            if not file_name.endswith(".onnx"):
+                continue
+            quantizer = ORTQuantizer.from_pretrained(fp32_dir, file_name=file_name)
+            quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+            # Giữ nguyên tên file để ORTModelForSpeechSeq2Seq tìm được encoder/decoder
+            os.replace(os.path.join(tmp_dir, file_name[:-5] + "_quantized.onnx"), os.path.join(tmp_dir, file_name))
+        os.replace(tmp_dir, int8_dir)
+        return int8_dir
+
+    def _create_pipeline(self, int8_dir):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+        from transformers import AutoProcessor, pipeline
+
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        model = ORTModelForSpeechSeq2Seq.from_pretrained(int8_dir, provider="CPUExecutionProvider",
+                                                         session_options=options)
+        processor = AutoProcessor.from_pretrained(int8_dir)
+        self.pipe = pipeline("automatic-speech-recognition", model=model, tokenizer=processor.tokenizer,
+                             feature_extractor=processor.feature_extractor)
+        self._pid = os.getpid()
+
+    def load(self):
+        int8_dir = os.path.join(self.model_dir, "int8")
+        if not os.path.isdir(int8_dir):
+            int8_dir = self._export()
+        self._create_pipeline(int8_dir)
+
+    def transcribe_batch(self, batch):
+        # Luồng của ONNX Runtime không còn sau khi fork (AsrProcessPool): worker tạo lại
+        # session của riêng mình ở lần gọi đầu, mô hình int8 nhỏ nên tốn thêm ít RAM
+        if self._pid != os.getpid():
+            self._create_pipeline(os.path.join(self.model_dir, "int8"))
+        return super().transcribe_batch(batch)
+
+
+ASR_BACKENDS = {
+    "transformers": TransformersBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def create_backend(name, model_name="vinai/PhoWhisper-tiny", model_dir="", threads=0):
+    # Chọn engine ASR theo cấu hình (ASR_BACKEND)
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"ASR_BACKEND không hợp lệ: {name} (chọn một trong {', '.join(ASR_BACKENDS)})")
+    if name == "onnx":
+        return OnnxBackend(model_name, model_dir, threads)
+    return TransformersBackend(model_name)
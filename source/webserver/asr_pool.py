@@ -0,0 +1,153 @@
+# Chạy PhoWhisper trong nhiều tiến trình con để dùng hết các nhân CPU của server.
+# Mô hình được nạp một lần trong tiến trình cha rồi fork các worker: trọng số dùng chung
+# theo copy-on-write nên RAM không tăng theo số worker. Âm thanh được ghi vào vùng
+# shared memory của từng worker, văn bản trả về qua hàng đợi.
+# Chỉ dùng được khi hệ điều hành hỗ trợ fork (Linux/macOS); Windows chạy trong tiến trình như cũ.
+import multiprocessing
+import queue
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MIN_SHM_BYTES = 30 * 16000 * 4  # đủ cho 30 giây float32 16 kHz, lớn hơn thì cấp lại
+RESULT_POLL_S = 1.0              # chờ kết quả theo từng khoảng để phát hiện worker chết
+
+
+def _worker_main(run_batch, tasks, results, threads):
+    # Chạy trong tiến trình con sau khi fork, mô hình đã có sẵn trong bộ nhớ thừa hưởng từ cha
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+    shm = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, shm_name, lengths = task
+        try:
+            if shm is None or shm.name != shm_name:
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+            audio = np.ndarray((sum(lengths),), dtype=np.float32, buffer=shm.buf)
+            batch = np.split(audio, np.cumsum(lengths)[:-1])
+            texts = run_batch(batch)
+            del audio, batch  # bỏ view trước khi đóng shared memory
+            results.put((task_id, texts, None))
+        except Exception as e:
+            results.put((task_id, None, repr(e)))
+    if shm is not None:
+        shm.close()
+
+
+class _Worker:
+    def __init__(self, ctx, run_batch, threads):
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.shm = None
+        self.task_id = 0
+        self.process = ctx.Process(target=_worker_main, args=(run_batch, self.tasks, self.results, threads),
+                                   name="asr-worker", daemon=True)
+        self.process.start()
+
+    def _buffer(self, nbytes):
+        # Vùng shared memory cố định cho worker, chỉ cấp lại khi batch lớn hơn
+        if self.shm is None or self.shm.size < nbytes:
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, MIN_SHM_BYTES))
+        return self.shm
+
+    def run(self, batch):
+        lengths = [len(samples) for samples in batch]
+        shm = self._buffer(sum(lengths) * 4)
+        audio = np.ndarray((sum(lengths),), dtype=np.float32, buffer=shm.buf)
+        offset = 0
+        for samples in batch:
+            audio[offset:offset + len(samples)] = samples
+            offset += len(samples)
+        del audio
+        self.task_id += 1
+        self.tasks.put((self.task_id, shm.name, lengths))
+        while True:
+            try:
+                task_id, texts, error = self.results.get(timeout=RESULT_POLL_S)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError(f"Worker ASR đã dừng (exit code {self.process.exitcode})")
+                continue
+            if task_id != self.task_id:
+                continue  # kết quả cũ của lần gọi bị lỗi trước đó
+            if error is not None:
+                raise RuntimeError("Worker ASR lỗi: " + error)
+            return texts
+
+    def close(self):
+        self.tasks.put(None)
+        self.process.join(timeout=5)
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class AsrProcessPool:
+    def __init__(self, run_batch, processes, threads_per_process=1):
+        self.run_batch = run_batch  # hàm: list mảng float32 -> list văn bản, chạy trong worker
+        self.processes = processes
+        self.threads_per_process = threads_per_process
+        self.workers = []
+        self._ctx = None
+        self._free = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self):
+        # Gọi sau khi đã nạp mô hình và trước khi chạy suy luận nào trong tiến trình cha
+        # (thread pool OpenMP đã khởi tạo có thể treo trong tiến trình con).
+        # Báo ValueError nếu hệ điều hành không hỗ trợ fork.
+        self._ctx = multiprocessing.get_context("fork")
+        # Các worker dùng chung resource tracker của tiến trình cha; nếu mỗi worker tự tạo
+        # tracker riêng, vùng shared memory sẽ bị xóa khi worker đó thoát
+        resource_tracker.ensure_running()
+        with self._lock:
+            for _ in range(self.processes):
+                worker = _Worker(self._ctx, self.run_batch, self.threads_per_process)
+                self.workers.append(worker)
+                self._free.put(worker)
+        print(f"Đã fork {self.processes} worker ASR ({self.threads_per_process} luồng mỗi worker)")
+
+    def transcribe_batch(self, batch):
+        # Gọi được từ nhiều luồng cùng lúc, mỗi lời gọi dùng một worker đang rảnh
+        worker = self._free.get()
+        if not worker.process.is_alive():
+            worker = self._respawn(worker)
+        try:
+            return worker.run(batch)
+        finally:
+            self._free.put(worker)
+
+    def _respawn(self, dead):
+        # Worker chết (ví dụ hết RAM) thì fork worker mới thay thế
+        print(f"Worker ASR đã dừng (exit code {dead.process.exitcode}), tạo worker mới")
+        with self._lock:
+            if dead.shm is not None:
+                dead.shm.close()
+                dead.shm.unlink()
+                dead.shm = None
+            worker = _Worker(self._ctx, self.run_batch, self.threads_per_process)
+            self.workers[self.workers.index(dead)] = worker
+        return worker
+
+    def warm_up(self, batch):
+        # Chạy thử trên tất cả worker để lần nhận diện đầu của mỗi worker không bị chậm
+        for worker in self.workers:
+            worker.run(batch)
+
+    def close(self):
+        with self._lock:
+            for worker in self.workers:
+                worker.close()
+            self.workers = []
@@ -0,0 +1,81 @@
+# Các hàm xử lý âm thanh trong bộ nhớ cho ws.py (không ghi file tạm)
+# Hậu xử lý sau TTS làm trên mảng NumPy: trộn mono, resample đa pha, tăng tốc giữ cao độ
+import io
+import wave
+from math import gcd
+
+import numpy as np
+
+from config import SAMPLE_RATE
+
+STRETCH_FRAME = SAMPLE_RATE * 40 // 1000      # khung 40 ms cho time-stretch
+STRETCH_TOLERANCE = SAMPLE_RATE * 10 // 1000  # dịch tối đa ±10 ms để khớp sóng
+
+
+def wav_bytes(pcm, rate=SAMPLE_RATE, channels=1, sampwidth=2):
+    # Gói PCM thành file WAV ngay trong bộ nhớ (header 44 byte + dữ liệu)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(sampwidth)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(pcm)
+    return buf.getvalue()
+
+
+def pcm16_from_float(samples):
+    # Mảng float trong [-1, 1] -> PCM int16 little-endian
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def to_mono_float(samples, channels=1):
+    # PCM int16 xen kẽ các kênh -> float32 mono trong [-1, 1]
+    x = np.asarray(samples, dtype=np.float32).reshape(-1, channels)
+    x = x.mean(axis=1) if channels > 1 else x[:, 0]
+    return x * (1.0 / 32768)
+
+
+def resample(samples, src_rate, dst_rate=SAMPLE_RATE):
+    # Resample đa pha (có lọc chống aliasing), ví dụ 24 kHz -> 16 kHz là up=2, down=3
+    if src_rate == dst_rate:
+        return samples
+    from scipy.signal import resample_poly
+    g = gcd(src_rate, dst_rate)
+    return resample_poly(samples, dst_rate // g, src_rate // g).astype(np.float32)
+
+
+def time_stretch(samples, speed, frame=STRETCH_FRAME, tolerance=STRETCH_TOLERANCE):
+    # Tăng tốc giữ nguyên cao độ (WSOLA): lấy các khung cách nhau speed * hop trong
+    # tín hiệu gốc, dịch mỗi khung trong ±tolerance cho khớp pha với khung trước,
+    # rồi chồng lấp 50% với cửa sổ Hann
+    if speed == 1.0 or len(samples) < 2 * frame:
+        return samples
+    hop = frame // 2
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)
+    n_out = int(len(samples) / speed)
+    n_frames = max(1, (n_out - frame) // hop + 1)
+
+    # Đệm hai đầu để mọi khung và vùng tìm kiếm đều nằm trong mảng
+    x = np.pad(samples, (tolerance, frame + 2 * tolerance + int(hop * speed) + 1))
+    out = np.zeros(n_frames * hop + frame, dtype=np.float32)
+    prev = tolerance
+    for k in range(n_frames):
+        target = tolerance + int(k * hop * speed)
+        if k == 0:
+            pos = target
+        else:
+            # Đoạn tiếp nối tự nhiên của khung trước, tìm vị trí giống nó nhất quanh target
+            template = x[prev + hop:prev + frame]
+            region = x[target - tolerance:target + tolerance + hop]
+            pos = target - tolerance + int(np.argmax(np.correlate(region, template, "valid")))
+        out[k * hop:k * hop + frame] += x[pos:pos + frame] * window
+        prev = pos
+    return out[:n_out]
+
+
+def postprocess(samples, rate, channels=1, speed=1.0, out_rate=SAMPLE_RATE):
+    # Từ PCM int16 đã giải mã tới PCM int16 mono out_rate đã tăng tốc, không qua pydub/ffmpeg
+    x = to_mono_float(samples, channels)
+    x = resample(x, rate, out_rate)
+    x = time_stretch(x, speed)
+    return pcm16_from_float(x)
@@ -0,0 +1,87 @@
+# So sánh engine ASR: pipeline PyTorch (transformers) và bản ONNX int8 (onnx)
+# Chạy:  python bench_asr.py file1.wav [file2.wav ...] [--repeat N] [--batch N]
+# Báo độ trễ trung vị mỗi engine, RAM tăng thêm khi nạp mô hình và tỉ lệ lỗi từ (WER)
+# của bản ONNX so với kết quả của pipeline PyTorch (coi như chuẩn).
+import argparse
+import resource
+import time
+import wave
+
+import numpy as np
+
+from asr_backends import create_backend
+from audio_utils import resample, to_mono_float
+from config import SAMPLE_RATE, ASR_MODEL, ASR_ONNX_DIR
+
+
+def load_wav(path):
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: cần WAV 16-bit")
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        rate, channels = f.getframerate(), f.getnchannels()
+    samples = to_mono_float(samples, channels)
+    if rate != SAMPLE_RATE:
+        samples = resample(samples, rate, SAMPLE_RATE)
+    return samples.astype(np.float32)
+
+
+def word_errors(reference, hypothesis):
+    # Khoảng cách chỉnh sửa theo từ (thay, thêm, bớt)
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1], len(ref)
+
+
+def rss_mb():
+    # Đỉnh RSS của tiến trình (Linux báo theo KB)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench(name, audio, repeat, batch):
+    before = rss_mb()
+    backend = create_backend(name, ASR_MODEL, ASR_ONNX_DIR)
+    start = time.perf_counter()
+    backend.load()
+    load_s = time.perf_counter() - start
+    backend.transcribe_batch(audio[:1])  # lần đầu có chi phí khởi tạo, không tính
+    texts = []
+    times = []
+    for _ in range(repeat):
+        texts = []
+        start = time.perf_counter()
+        for i in range(0, len(audio), batch):
+            texts += backend.transcribe_batch(audio[i:i + batch])
+        times.append(time.perf_counter() - start)
+    seconds = sum(len(samples) for samples in audio) / SAMPLE_RATE
+    median = np.median(times)
+    print(f"{backend.name:32s} nạp {load_s:6.1f} s   trung vị {median * 1000:8.1f} ms   "
+          f"RTF {median / seconds:.3f}   RAM +{rss_mb() - before:.0f} MB")
+    return texts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    audio = [load_wav(path) for path in args.files]
+    print(f"Đầu vào: {len(audio)} file, {sum(len(a) for a in audio) / SAMPLE_RATE:.1f} s, batch {args.batch}")
+    # Nạp bản ONNX trước: đỉnh RSS chỉ tăng, đo sau sẽ bị lẫn RAM của mô hình trước
+    onnx_texts = bench("onnx", audio, args.repeat, args.batch)
+    torch_texts = bench("transformers", audio, args.repeat, args.batch)
+
+    errors = words = 0
+    for path, ref, hyp in zip(args.files, torch_texts, onnx_texts):
+        e, n = word_errors(ref, hyp)
+        errors += e
+        words += n
+        if e:
+            print(f"  {path}: khác {e}/{n} từ\n    torch: {ref}\n    onnx:  {hyp}")
+    print(f"WER của onnx so với transformers: {errors / max(words, 1) * 100:.2f}% ({errors}/{words} từ)")
@@ -0,0 +1,64 @@
+# So sánh thời gian hậu xử lý sau TTS: đường cũ qua pydub và đường NumPy/SciPy mới
+# Chạy:  python bench_audio.py [file.mp3] [số lần lặp]
+# Không có file thì dùng tín hiệu giả lập 5 giây, 24 kHz mono (giống đầu ra của gTTS)
+import sys
+import time
+
+import numpy as np
+
+from audio_utils import postprocess
+from config import SAMPLE_RATE
+from tts import SPEED
+
+
+def load_input(path):
+    if path is None:
+        rate = 24000
+        t = np.arange(rate * 5) / rate
+        tone = np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+        samples = (tone * 0.3 + np.random.randn(len(t)) * 0.01) * 32767
+        return samples.astype(np.int16), rate, 1
+    import miniaudio
+    decoded = miniaudio.decode_file(path, output_format=miniaudio.SampleFormat.SIGNED16)
+    return np.frombuffer(decoded.samples, dtype=np.int16), decoded.sample_rate, decoded.nchannels
+
+
+def pydub_path(samples, rate, channels):
+    # Giống text_to_pcm trước đây: _spawn đổi frame rate để tăng tốc rồi chuyển định dạng
+    from pydub import AudioSegment
+    audio = AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=rate, channels=channels)
+    audio = audio._spawn(audio.raw_data, overrides={'frame_rate': int(audio.frame_rate * SPEED)})
+    audio = audio.set_frame_rate(SAMPLE_RATE)
+    audio = audio.set_channels(1)
+    audio = audio.set_sample_width(2)
+    return audio.raw_data
+
+
+def numpy_path(samples, rate, channels):
+    return postprocess(samples, rate, channels, speed=SPEED)
+
+
+def bench(name, fn, args, repeat):
+    fn(*args)  # lần đầu có chi phí import, không tính
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(*args)
+        times.append(time.perf_counter() - start)
+    times = np.array(times) * 1000
+    print(f"{name:8s} trung vị {np.median(times):8.2f} ms   min {times.min():8.2f} ms   "
+          f"đầu ra {len(out) / 2 / SAMPLE_RATE:.2f} s")
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    samples, rate, channels = load_input(path)
+    print(f"Đầu vào: {len(samples) / channels / rate:.2f} s, {rate} Hz, {channels} kênh, tốc độ x{SPEED}")
+    bench("numpy", numpy_path, (samples, rate, channels), repeat)
+    try:
+        import pydub
+    except ImportError:
+        print("pydub   (chưa cài pydub, bỏ qua)")
+    else:
+        bench("pydub", pydub_path, (samples, rate, channels), repeat)
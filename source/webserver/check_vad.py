@@ -0,0 +1,57 @@
+# Kiểm tra nhanh VAD (vad.py) trên tín hiệu giả lập: nhiễu phòng, "tiếng nói" hữu thanh,
+# và các đoạn toàn số 0 như lúc micro vừa bật hoặc khung mất được uplink.py bù 0.
+# Chạy:  python check_vad.py   (báo lỗi AssertionError nếu có trường hợp sai)
+import numpy as np
+
+from config import SAMPLE_RATE
+from vad import Endpointer, has_speech, trim_silence
+
+rng = np.random.default_rng(0)
+
+
+def noise(seconds, db=-60.0):
+    return rng.normal(0, 10 ** (db / 20), int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+
+def speech(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voiced = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((180, 360, 540, 720), 1))
+    return (0.1 * voiced * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))).astype(np.float32) + noise(seconds)
+
+
+def zeros(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def pcm(samples):
+    return (np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def endpoint_at(samples, chunk=4096):
+    # Giây mà Endpointer báo hết câu khi nhận âm thanh theo từng chunk như ws.py, None nếu không báo
+    endpointer = Endpointer()
+    data = pcm(samples)
+    for start in range(0, len(data), chunk):
+        if endpointer.feed(data[start:start + chunk]):
+            return (start + chunk) / 2 / SAMPLE_RATE
+    return None
+
+
+CASES = {
+    "nhiễu": np.concatenate([noise(0.5), speech(1.5), noise(1.5)]),
+    "0 ở đầu": np.concatenate([zeros(0.1), noise(0.4), speech(1.5), noise(1.5)]),
+    "0 ở giữa": np.concatenate([noise(0.5), speech(0.7), zeros(0.256), speech(0.7), noise(1.5)]),
+    "0 sau câu": np.concatenate([noise(0.5), speech(1.5), zeros(0.3), noise(1.5)]),
+}
+
+if __name__ == '__main__':
+    for name, samples in CASES.items():
+        at = endpoint_at(samples)
+        print(f"{name:10s} hết câu lúc " + ("không phát hiện" if at is None else f"{at:.2f}s"))
+        assert at is not None, f"{name}: Endpointer không phát hiện hết câu"
+        assert at <= len(samples) / SAMPLE_RATE - 0.3, f"{name}: phát hiện quá muộn"
+
+    assert not has_speech(np.concatenate([zeros(0.2), noise(1.0)])), "nhiễu sau khung 0 bị coi là tiếng nói"
+    trimmed = trim_silence(CASES["0 ở đầu"])
+    assert len(trimmed) < 2.3 * SAMPLE_RATE, f"trim_silence giữ {len(trimmed) / SAMPLE_RATE:.2f}s"
+    print("OK")
@@ -0,0 +1,112 @@
+# Cấu hình cho server Kiddy (ws.py)
+# Mọi giá trị đều có thể ghi đè bằng biến môi trường cùng tên, ví dụ:
+#   STREAMING_ASR=0 python ws.py
+import os
+
+
+def _env(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return type(default)(value)
+
+
+# --- Định dạng âm thanh client gửi lên (mono, 16-bit) ---
+SAMPLE_RATE = 16000
+
+# --- Buffer âm thanh nhận lên ---
+# Độ dài tối đa của một lượt nói giữ trong RAM (giây)
+INGEST_MAX_S = _env("INGEST_MAX_S", 120.0)
+# Khi đầy: drop_oldest bỏ phần cũ nhất, reject từ chối chunk mới (HTTP 413)
+INGEST_OVERFLOW = _env("INGEST_OVERFLOW", "drop_oldest")
+
+# --- Nhận diện giọng nói (ASR) ---
+# transformers: pipeline PyTorch float32; onnx: bản ONNX lượng tử hóa int8 (ONNX Runtime, CPU)
+ASR_BACKEND = _env("ASR_BACKEND", "transformers")
+ASR_MODEL = _env("ASR_MODEL", "vinai/PhoWhisper-tiny")
+# Thư mục chứa bản ONNX đã xuất (để trống: onnx/<tên mô hình>), tự tạo ở lần chạy đầu
+ASR_ONNX_DIR = _env("ASR_ONNX_DIR", "")
+# Bật chế độ nhận diện dần trong lúc các chunk còn đang được gửi lên
+STREAMING_ASR = _env("STREAMING_ASR", True)
+# Độ dài mỗi đoạn được giải mã trong nền (giây). Ngắn để cả lượt nói 1-5 giây thường gặp
+# cũng được giải mã dần, lúc nhả nút chỉ còn phần đuôi; đoạn ngắn cho Whisper ít ngữ cảnh hơn
+# nên có thể sai hơn một chút ở chỗ cắt, tăng lên nếu ưu tiên độ chính xác hơn độ trễ
+ASR_SEGMENT_S = _env("ASR_SEGMENT_S", 2.5)
+# Khoảng cuối đoạn dùng để tìm chỗ im lặng nhất làm điểm cắt (giây)
+ASR_LOOKBACK_S = _env("ASR_LOOKBACK_S", 1.0)
+# Gom các yêu cầu nhận diện tới trong khoảng này (giây) thành một batch, tối đa ASR_BATCH_SIZE
+ASR_BATCH_WINDOW_S = _env("ASR_BATCH_WINDOW_S", 0.05)
+ASR_BATCH_SIZE = _env("ASR_BATCH_SIZE", 8)
+# Câu nói dài hơn ASR_LONG_WINDOW_S (Whisper chỉ nhận 30 giây) được chia thành nhiều cửa sổ,
+# cắt ở khoảng lặng trong ASR_LONG_LOOKBACK_S giây cuối mỗi cửa sổ, không có thì cắt cứng
+# và cho hai cửa sổ chồng nhau ASR_LONG_OVERLAP_S giây
+ASR_LONG_WINDOW_S = _env("ASR_LONG_WINDOW_S", 28.0)
+ASR_LONG_LOOKBACK_S = _env("ASR_LONG_LOOKBACK_S", 5.0)
+ASR_LONG_OVERLAP_S = _env("ASR_LONG_OVERLAP_S", 2.0)
+# Số tiến trình worker ASR (fork sau khi nạp mô hình, dùng chung trọng số), 0 = chạy trong tiến trình
+ASR_PROCESSES = _env("ASR_PROCESSES", 0)
+
+# --- Phiên làm việc theo thiết bị ---
+# Header mà ESP32 gửi kèm để xác định thiết bị (robot) của phiên
+DEVICE_HEADER = "X-Device-Id"
+DEFAULT_DEVICE = "default"
+# Phiên không hoạt động quá thời gian này (giây) sẽ bị xóa
+SESSION_TTL_S = _env("SESSION_TTL_S", 1800)
+# Giới hạn số phiên và tổng bộ nhớ âm thanh của tất cả các phiên
+MAX_SESSIONS = _env("MAX_SESSIONS", 64)
+SESSIONS_MAX_BYTES = _env("SESSIONS_MAX_BYTES", 256 * 1024 * 1024)
+# Số thiết bị tối đa được giữ định dạng âm thanh đã đăng ký (bỏ thiết bị lâu không dùng nhất)
+MAX_PROFILES = _env("MAX_PROFILES", 256)
+
+# Thời gian tối đa /wait_response giữ kết nối chờ phản hồi (giây)
+WAIT_RESPONSE_MAX_S = _env("WAIT_RESPONSE_MAX_S", 30.0)
+
+# --- Hàng đợi xử lý ASR -> LLM -> TTS ---
+# Số luồng xử lý song song và số job tối đa được chờ trong hàng đợi
+JOB_WORKERS = _env("JOB_WORKERS", 4)
+JOB_QUEUE_MAX = _env("JOB_QUEUE_MAX", 16)
+# Số job đã xong được giữ lại để thiết bị tra cứu trạng thái
+JOB_HISTORY = _env("JOB_HISTORY", 256)
+
+# --- Bộ nhớ hội thoại ---
+# Số lượt gần nhất giữ nguyên văn, các lượt cũ hơn được gộp vào bản tóm tắt
+MEMORY_TURNS = _env("MEMORY_TURNS", 6)
+# Ngân sách token (ước lượng) cho toàn bộ ngữ cảnh gửi tới LLM
+MEMORY_TOKEN_BUDGET = _env("MEMORY_TOKEN_BUDGET", 1200)
+
+# --- Bộ nhớ đệm TTS ---
+# Dung lượng tối đa của bộ nhớ đệm trong RAM (byte PCM)
+TTS_CACHE_MAX_BYTES = _env("TTS_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+# Thư mục lưu thêm bản sao trên đĩa (để trống để tắt), còn nguyên sau khi khởi động lại
+TTS_CACHE_DIR = _env("TTS_CACHE_DIR", "")
+
+# --- TTS ---
+# gtts: Google TTS qua Internet; mms: MMS-TTS tiếng Việt chạy cục bộ trên CPU
+TTS_BACKEND = _env("TTS_BACKEND", "gtts")
+TTS_MODEL = _env("TTS_MODEL", "facebook/mms-tts-vie")
+
+# --- Phát hiện giọng nói (VAD) ---
+# Cắt khoảng lặng đầu/cuối trước khi nhận diện
+VAD_TRIM = _env("VAD_TRIM", True)
+# Tự bắt đầu xử lý khi phát hiện người nói đã dừng, không chờ /end_audio
+AUTO_ENDPOINT = _env("AUTO_ENDPOINT", False)
+# Im lặng liên tục bao lâu (giây) thì coi là hết câu
+END_SILENCE_S = _env("END_SILENCE_S", 0.8)
+
+# --- Lệnh cho robot (intents.py) ---
+# Lượt nói khớp lệnh (nhảy, hát, đi thẳng...) được trả về mã hành động, không qua LLM/TTS
+INTENT_ROUTER = _env("INTENT_ROUTER", True)
+# File JSON ví dụ cho bộ phân loại trigram (để trống để chỉ dùng bảng từ khóa)
+INTENT_EXAMPLES = _env("INTENT_EXAMPLES", "")
+
+# --- LLM ---
+# gemini: Google Gemini; local: server tương thích OpenAI (fake_llm.py, llama.cpp, Ollama...)
+LLM_BACKEND = _env("LLM_BACKEND", "gemini")
+LLM_MODEL = _env("LLM_MODEL", "gemini-2.0-flash")
+LOCAL_LLM_URL = _env("LOCAL_LLM_URL", "http://127.0.0.1:8080/v1/chat/completions")
+
+# --- Kênh thoại TCP (voice_channel.py) ---
+# Cổng cho thiết bị giữ một kết nối hai chiều, 0 để tắt
+VOICE_PORT = _env("VOICE_PORT", 8001)
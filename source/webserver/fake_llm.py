@@ -0,0 +1,41 @@
+# Server LLM giả lập (tương thích OpenAI /v1/chat/completions) để thử ws.py không cần Gemini
+# Chạy:  python fake_llm.py        rồi:  LLM_BACKEND=local python ws.py
+# FAKE_LLM_DELAY: độ trễ giả lập giữa các từ (giây)
+import json
+import os
+import time
+from flask import Flask, request, Response, jsonify
+
+DELAY = float(os.environ.get("FAKE_LLM_DELAY", "0.05"))
+
+app = Flask(__name__)
+
+
+def make_reply(messages):
+    user = [m["content"] for m in messages if m["role"] == "user"]
+    if not user:
+        return "Chào bạn! Mình là Kiddy."
+    return f"Mình nghe bạn nói: {user[-1]}. Bạn kể thêm cho mình nghe nhé! Đây là lượt thứ {len(user)}."
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    body = request.get_json()
+    reply = make_reply(body.get("messages", []))
+
+    if not body.get("stream"):
+        time.sleep(DELAY * len(reply.split()))
+        return jsonify({"choices": [{"index": 0, "message": {"role": "assistant", "content": reply}}]})
+
+    def events():
+        for word in reply.split(" "):
+            time.sleep(DELAY)
+            delta = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+            yield f"data: {json.dumps(delta, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return Response(events(), content_type="text/event-stream; charset=utf-8")
+
+
+if __name__ == '__main__':
+    app.run(host='127.0.0.1', port=8080, threaded=True)
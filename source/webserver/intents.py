@@ -0,0 +1,131 @@
+# Nhận lệnh cho robot ngay sau ASR ("nhảy đi", "hát bài cá mập", "đi thẳng"...):
+# lượt nói khớp lệnh được trả về một mã hành động để robot tự làm bằng những gì có sẵn
+# trên thẻ nhớ, bỏ qua hẳn LLM và TTS.
+# - Bảng từ khóa, so khớp gần đúng (difflib) để chịu được lỗi nhận diện nhỏ
+# - Tùy chọn: bộ phân loại Naive Bayes trên trigram ký tự, học từ file ví dụ JSON
+#   {"DANCE": ["nhảy đi", ...], ..., "NONE": ["kể chuyện cho con nghe", ...]}
+# Mã hành động: DANCE, PLAY:<tên file wav>, MOVE:f|b|l|r (như Robot.move), STOP
+import difflib
+import json
+import math
+import re
+import unicodedata
+from collections import Counter
+
+NONE = "NONE"
+
+# (mã hành động, các cụm từ). Chỉ dùng cụm rõ nghĩa ra lệnh: từ đơn như "nhảy", "lùi" hay
+# "bên trái", "đi lên" cũng hay gặp trong câu chuyện bình thường
+KEYWORDS = [
+    ("DANCE", ["nhảy đi", "nhảy múa", "nhảy cho con xem", "múa đi", "khiêu vũ"]),
+    ("PLAY:BABYSHARK", ["hát bài cá mập", "bài cá mập", "baby shark", "hát đi", "hát cho con nghe"]),
+    ("MOVE:f", ["đi thẳng", "đi tới", "tiến lên", "chạy thẳng"]),
+    ("MOVE:b", ["đi lùi", "lùi lại"]),
+    ("MOVE:l", ["rẽ trái", "quẹo trái", "sang trái"]),
+    ("MOVE:r", ["rẽ phải", "quẹo phải", "sang phải"]),
+    ("STOP", ["dừng lại", "đứng lại", "đứng yên"]),
+]
+
+MAX_WORDS = 8  # câu dài hơn thường là bé kể chuyện, không phải ra lệnh
+# Câu hỏi hay câu phủ định ("bạn có biết nhảy không", "con không thích nhảy") không phải lệnh
+QUESTION_WORDS = {"không", "sao", "đâu", "gì", "chưa", "chẳng", "chả", "đừng", "ai", "mấy", "bao"}
+# Từ gọi, từ đệm được tính là một phần của lệnh ("Kiddy ơi nhảy đi nào")
+FILLER_WORDS = {"kiddy", "robot", "ơi", "nào", "nhé", "nha", "đi", "hãy", "con", "mình", "bạn",
+                "muốn", "cho", "xem", "nghe", "với", "ạ", "à", "đó", "luôn", "thử"}
+MIN_COVERAGE = 0.8  # cụm lệnh và từ đệm phải chiếm chừng này phần số từ của câu
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFC", text.lower())
+    return re.sub(r"[^\w\s]", " ", text).split()
+
+
+class TrigramClassifier:
+    # Naive Bayes đa thức trên trigram ký tự: nhỏ, học trong vài mili giây, chịu được
+    # từ bị nhận diện sai một vài chữ cái
+    def __init__(self, examples):
+        self.counts = {}
+        self.totals = {}
+        self.priors = {}
+        vocab = set()
+        n = sum(len(texts) for texts in examples.values())
+        for label, texts in examples.items():
+            grams = Counter()
+            for text in texts:
+                grams.update(self.grams(text))
+            self.counts[label] = grams
+            self.totals[label] = sum(grams.values())
+            self.priors[label] = math.log(len(texts) / n)
+            vocab.update(grams)
+        self.vocab = len(vocab) + 1
+
+    @staticmethod
+    def grams(text):
+        padded = " " + " ".join(normalize(text)) + " "
+        return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            examples = json.load(f)
+        if NONE not in examples:
+            raise ValueError(f"{path}: cần nhóm {NONE} gồm các câu không phải lệnh")
+        return cls(examples)
+
+    def predict(self, text):
+        # Trả về (nhãn, xác suất hậu nghiệm)
+        grams = self.grams(text)
+        scores = {}
+        for label, counts in self.counts.items():
+            denom = math.log(self.totals[label] + self.vocab)
+            scores[label] = self.priors[label] + sum(math.log(counts[g] + 1) - denom for g in grams)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+
+class IntentRouter:
+    def __init__(self, keywords=KEYWORDS, threshold=0.85, classifier=None, min_prob=0.9):
+        # threshold: độ giống tối thiểu (difflib) khi so khớp gần đúng một cụm từ
+        # min_prob: xác suất tối thiểu để tin bộ phân loại
+        self.phrases = [(action, normalize(phrase)) for action, phrases in keywords for phrase in phrases]
+        # Cụm dài trước để "hát bài cá mập" không bị "bài cá mập" chiếm chỗ
+        self.phrases.sort(key=lambda item: -len(item[1]))
+        self.threshold = threshold
+        self.classifier = classifier
+        self.min_prob = min_prob
+
+    @staticmethod
+    def _covers(words, start, length):
+        # Cụm khớp cộng các từ đệm ở ngoài cụm phải chiếm gần hết câu
+        rest = words[:start] + words[start + length:]
+        covered = length + sum(1 for word in rest if word in FILLER_WORDS)
+        return covered >= MIN_COVERAGE * len(words)
+
+    def _keyword(self, words):
+        for action, phrase in self.phrases:
+            for i in range(len(words) - len(phrase) + 1):
+                if words[i:i + len(phrase)] == phrase and self._covers(words, i, len(phrase)):
+                    return action
+        best, best_ratio = None, self.threshold
+        for action, phrase in self.phrases:
+            target = " ".join(phrase)
+            for i in range(len(words) - len(phrase) + 1):
+                ratio = difflib.SequenceMatcher(None, " ".join(words[i:i + len(phrase)]), target).ratio()
+                if ratio >= best_ratio and self._covers(words, i, len(phrase)):
+                    best, best_ratio = action, ratio
+        return best
+
+    def match(self, text):
+        # Mã hành động hoặc None nếu lượt nói nên đi qua LLM như bình thường
+        words = normalize(text)
+        if not words or len(words) > MAX_WORDS:
+            return None
+        if "?" in text or QUESTION_WORDS.intersection(words):
+            return None
+        action = self._keyword(words)
+        if action is None and self.classifier is not None:
+            label, prob = self.classifier.predict(text)
+            if label != NONE and prob >= self.min_prob:
+                action = label
+        return action
@@ -0,0 +1,93 @@
+# Hàng đợi job cho pipeline ASR -> LLM -> TTS của ws.py
+# /end_audio chỉ đưa job vào hàng đợi rồi trả về ngay, một nhóm luồng cố định
+# sẽ xử lý lần lượt. Khi hàng đợi đầy, submit() báo lỗi để server trả 503.
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, device_id, fn):
+        self.id = job_id
+        self.device_id = device_id
+        self.fn = fn            # hàm fn(job) chạy toàn bộ pipeline
+        self.state = "queued"   # queued -> running -> done / error
+        self.stage = None       # bước đang chạy: asr, llm, tts
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def active(self):
+        return self.state in ("queued", "running")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "device": self.device_id,
+            "state": self.state,
+            "stage": self.stage,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobQueue:
+    def __init__(self, workers=4, max_pending=16, history=256):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True).start()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def full(self):
+        return self._queue.full()
+
+    def submit(self, device_id, fn):
+        with self._lock:
+            job = Job(f"{next(self._ids)}", device_id, fn)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull()
+            self._jobs[job.id] = job
+            # Chỉ giữ lại lịch sử của các job gần nhất
+            while len(self._jobs) > self._history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active():
+                    break
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.state = "running"
+            job.started = time.time()
+            try:
+                job.fn(job)
+                job.state = "done"
+            except Exception as e:
+                print(f"[{job.device_id}] Lỗi job {job.id}:", e)
+                job.error = str(e)
+                job.state = "error"
+            finally:
+                job.finished = time.time()
+                self._queue.task_done()
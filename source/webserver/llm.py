@@ -0,0 +1,85 @@
+# Các backend LLM cho ws.py
+# Mỗi phiên giữ một đối tượng chat (system instruction + hội thoại) và dùng lại qua các lượt,
+# chỉ tạo lại khi reset phiên hoặc khi bộ nhớ hội thoại vừa được tóm tắt lại.
+#   - GeminiBackend: Google Gemini (mặc định)
+#   - LocalBackend: server tương thích OpenAI chạy trong mạng nội bộ, ví dụ fake_llm.py
+#     để thử nghiệm, hoặc llama.cpp / Ollama
+import json
+import requests
+
+
+class GeminiChat:
+    def __init__(self, model, history):
+        self.chat = model.start_chat(history=history)
+
+    def send_stream(self, text):
+        for chunk in self.chat.send_message(text, stream=True):
+            yield chunk.text
+
+
+class GeminiBackend:
+    def __init__(self, api_key, model_name="gemini-2.0-flash"):
+        import google.generativeai as genai
+        self.genai = genai
+        self.model_name = model_name
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def new_chat(self, system_prompt, turns):
+        # Gemini giữ vai trò user/model thay vì một danh sách chuỗi rời rạc
+        model = self.genai.GenerativeModel(self.model_name, system_instruction=system_prompt)
+        history = [{"role": "user" if m["role"] == "user" else "model", "parts": [m["content"]]}
+                   for m in turns]
+        return GeminiChat(model, history)
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+
+class LocalChat:
+    def __init__(self, backend, system_prompt, turns):
+        self.backend = backend
+        self.messages = [{"role": "system", "content": system_prompt}] + [
+            {"role": m["role"], "content": m["content"]} for m in turns]
+
+    def send_stream(self, text):
+        self.messages.append({"role": "user", "content": text})
+        parts = []
+        for piece in self.backend.stream(self.messages):
+            parts.append(piece)
+            yield piece
+        self.messages.append({"role": "assistant", "content": "".join(parts)})
+
+
+class LocalBackend:
+    def __init__(self, url, model_name="kiddy-local", timeout=60):
+        self.url = url
+        self.model_name = model_name
+        self.timeout = timeout
+        self.http = requests.Session()  # giữ kết nối keep-alive tới server LLM
+
+    def new_chat(self, system_prompt, turns):
+        return LocalChat(self, system_prompt, turns)
+
+    def stream(self, messages):
+        body = {"model": self.model_name, "messages": messages, "stream": True}
+        with self.http.post(self.url, json=body, stream=True, timeout=self.timeout) as res:
+            res.raise_for_status()
+            # Server trả về dạng server-sent events: "data: {...}" cho tới "data: [DONE]"
+            # Tự giải mã UTF-8: không có charset thì requests coi là ISO-8859-1, hỏng dấu tiếng Việt
+            for line in res.iter_lines():
+                line = line.decode("utf-8")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+
+    def generate(self, prompt):
+        body = {"model": self.model_name, "messages": [{"role": "user", "content": prompt}]}
+        res = self.http.post(self.url, json=body, timeout=self.timeout)
+        res.raise_for_status()
+        return res.json()["choices"][0]["message"]["content"]
@@ -0,0 +1,82 @@
+# Bộ nhớ hội thoại có giới hạn cho mỗi phiên
+# Giữ nguyên prompt hệ thống và vài lượt gần nhất, các lượt cũ hơn được gộp dần vào
+# một bản tóm tắt (chạy trong luồng nền), nên độ dài prompt gửi cho LLM không tăng
+# theo thời gian bé trò chuyện.
+import threading
+
+
+def estimate_tokens(text):
+    # Ước lượng thô, đủ để giữ prompt trong ngân sách mà không phải gọi API đếm token
+    return len(text) // 3 + 1
+
+
+class ConversationMemory:
+    def __init__(self, system_prompt, summarize, max_turns=6, token_budget=1200):
+        self.summarize = summarize  # hàm: (tóm tắt cũ, list lượt cũ) -> tóm tắt mới
+        self.max_messages = max_turns * 2  # mỗi lượt gồm câu của bé và câu trả lời
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self._summarizing = False
+        self._generation = 0  # tăng mỗi lần reset để bỏ kết quả tóm tắt của phiên cũ
+        self.version = 0      # tăng mỗi khi ngữ cảnh đổi ngoài việc thêm lượt (reset, tóm tắt)
+        self.reset(system_prompt)
+
+    def reset(self, system_prompt):
+        with self._lock:
+            self.system_prompt = system_prompt
+            self.summary = ""
+            self.turns = []
+            self._generation += 1
+            self.version += 1
+
+    def add(self, role, content):
+        with self._lock:
+            self.turns.append({"role": role, "content": content})
+        self._maybe_compact()
+
+    def chat_state(self):
+        # (version, system instruction gồm cả bản tóm tắt, các lượt gần nhất) để tạo phiên chat mới
+        with self._lock:
+            system = self.system_prompt
+            if self.summary:
+                system += "\n\nTóm tắt cuộc trò chuyện trước đó: " + self.summary
+            return self.version, system, list(self.turns)
+
+    def _maybe_compact(self):
+        with self._lock:
+            over = len(self.turns) > self.max_messages or self._tokens_locked() > self.token_budget
+            if not over or self._summarizing:
+                return
+            # Gộp tới khi còn khoảng nửa cửa sổ (số lượt chẵn) để lần tóm tắt sau cách
+            # max_turns/2 lượt, không phải gọi LLM và tạo lại phiên chat sau mỗi lượt
+            keep = min(self.max_messages // 2, len(self.turns) // 2)
+            count = len(self.turns) - keep
+            old = self.turns[:count - count % 2]
+            if not old:
+                return
+            self._summarizing = True
+            args = (self.summary, old, self._generation)
+        threading.Thread(target=self._compact, args=args, daemon=True).start()
+
+    def _compact(self, summary, old, generation):
+        try:
+            new_summary = self.summarize(summary, old)
+        except Exception as e:
+            print("Lỗi tóm tắt hội thoại:", e)
+            new_summary = None
+        with self._lock:
+            self._summarizing = False
+            if generation != self._generation:
+                return  # phiên đã bị reset trong lúc tóm tắt
+            if new_summary:
+                self.summary = new_summary.strip()
+                del self.turns[:len(old)]
+                self.version += 1
+            elif self._tokens_locked() > 2 * self.token_budget:
+                # Không tóm tắt được mà đã vượt xa ngân sách: bỏ các lượt cũ nhất
+                del self.turns[:len(old)]
+                self.version += 1
+
+    def _tokens_locked(self):
+        total = estimate_tokens(self.system_prompt) + estimate_tokens(self.summary)
+        return total + sum(estimate_tokens(m["content"]) for m in self.turns)
@@ -0,0 +1,140 @@
+# Số liệu đo đạc của pipeline giọng nói, xuất ra dạng text của Prometheus tại /metrics
+# Cách dùng:
+#   with STAGE_SECONDS.time(stage="asr"):
+#       ...
+#   BYTES_IN.inc(len(chunk))
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _labels_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels_text(self.labels, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, fn):
+        super().__init__(name, help)
+        self.fn = fn  # giá trị được đọc tại thời điểm xuất số liệu
+
+    def _samples(self):
+        return [f"{self.name} {_number(self.fn())}"]
+
+
+class CounterFunc(Gauge):
+    # Bộ đếm chỉ tăng do đối tượng khác giữ (ví dụ TtsCache.hits), đọc lúc xuất số liệu
+    kind = "counter"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}  # key -> [số đếm theo bucket..., tổng, số lần]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, data in items:
+            for bound, count in zip(self.buckets, data):
+                labels = _labels_text(self.labels, key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _labels_text(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_number(data[-2])}")
+            lines.append(f"{self.name}_count{labels} {data[-1]}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Các số liệu dùng chung của server ---
+# stage: ingest, wav_assembly, asr_segment (nhận diện nền), asr, intent, llm, tts, resample, download
+STAGE_SECONDS = Histogram("kiddy_stage_seconds", "Thời gian xử lý mỗi bước của pipeline", ["stage"])
+STAGE_ERRORS = Counter("kiddy_stage_errors_total", "Số lỗi theo từng bước của pipeline", ["stage"])
+REQUESTS = Counter("kiddy_requests_total", "Số request HTTP theo endpoint và mã trạng thái", ["endpoint", "status"])
+BYTES_IN = Counter("kiddy_audio_bytes_in_total", "Tổng số byte âm thanh nhận từ thiết bị")
+INTENTS = Counter("kiddy_intents_total", "Số lượt nói được trả lời bằng lệnh cho robot, không qua LLM", ["action"])
+BYTES_OUT = Counter("kiddy_audio_bytes_out_total", "Tổng số byte âm thanh gửi về thiết bị")
+ASR_BATCH = Histogram("kiddy_asr_batch_size", "Số đoạn âm thanh trong mỗi batch PhoWhisper",
+                      buckets=(1, 2, 4, 8, 16, 32))
@@ -0,0 +1,121 @@
+# Buffer PCM 16-bit cấp phát trước và có giới hạn dung lượng cho âm thanh một lượt nói
+# Body request được đọc thẳng vào buffer (readinto), ASR lấy view NumPy không sao chép.
+# Khi đầy: "drop_oldest" bỏ phần âm thanh cũ nhất, "reject" báo BufferFull (ws.py trả 413).
+# Mỗi lần ghi phải là số nguyên mẫu 16-bit: byte lẻ cuối cùng bị bỏ, nếu không mọi mẫu
+# ghi sau đó sẽ lệch một byte.
+import threading
+
+import numpy as np
+
+OVERFLOWS = ("drop_oldest", "reject")
+READ_BLOCK = 64 * 1024  # mỗi lần đọc từ request tối đa chừng này byte (2 giây âm thanh)
+
+
+class BufferFull(Exception):
+    pass
+
+
+class PcmBuffer:
+    def __init__(self, capacity_bytes, overflow="drop_oldest"):
+        if overflow not in OVERFLOWS:
+            raise ValueError(f"overflow phải là một trong {OVERFLOWS}")
+        self.capacity = capacity_bytes - capacity_bytes % 2
+        self.overflow = overflow
+        # np.empty chỉ giữ chỗ, trang nhớ được cấp thật khi có dữ liệu ghi tới
+        self._array = np.empty(self.capacity // 2, dtype=np.int16)
+        self._bytes = self._array.view(np.uint8)
+        self.nbytes = 0
+        self.start = 0  # số mẫu đã bị bỏ ở đầu; mẫu thứ i (tính từ đầu lượt nói) nằm ở i - start
+        # lock: người đọc giữ khi dùng view, vì bỏ dữ liệu cũ sẽ dồn mảng
+        # _write_lock: các request cùng ghi vào một phiên được xếp lần lượt
+        self.lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def __len__(self):
+        return self.nbytes
+
+    def span(self):
+        # Khoảng mẫu [start, end) đang có trong buffer
+        return self.start, self.start + self.nbytes // 2
+
+    def view(self, begin=None, end=None):
+        # View int16 (không sao chép) của các mẫu [begin, end), gọi khi đang giữ self.lock
+        first, last = self.span()
+        begin = first if begin is None else max(begin, first)
+        end = last if end is None else min(end, last)
+        return self._array[begin - first:max(begin, end) - first]
+
+    def _make_room(self, n):
+        # Bảo đảm còn ít nhất min(n, capacity) byte trống sau dữ liệu hiện có
+        free = self.capacity - self.nbytes
+        if n <= free:
+            return
+        if self.overflow == "reject":
+            raise BufferFull(f"Âm thanh vượt quá {self.capacity} byte")
+        drop = min(n, self.capacity) - free
+        drop += drop % 2
+        with self.lock:
+            keep = self.nbytes - drop
+            self._bytes[:keep] = self._bytes[drop:self.nbytes]
+            self.nbytes = keep
+            self.start += drop // 2
+
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        if len(data) % 2:
+            print("Bỏ byte lẻ cuối chunk âm thanh")
+            data = data[:-1]
+        if len(data) > self.capacity:
+            if self.overflow == "reject":
+                raise BufferFull(f"Âm thanh vượt quá {self.capacity} byte")
+            data = data[len(data) - self.capacity:]
+        with self._write_lock:
+            self._make_room(len(data))
+            self._bytes[self.nbytes:self.nbytes + len(data)] = data
+            with self.lock:
+                self.nbytes += len(data)
+        return len(data)
+
+    def read_from(self, stream, length=None):
+        # Đọc body request thẳng vào phần trống của buffer, không tạo bản sao như request.data.
+        # length: Content-Length nếu có (None với upload chunked). Trả về số byte đã đọc.
+        if self.overflow == "reject" and length is not None and self.nbytes + length > self.capacity:
+            raise BufferFull(f"Âm thanh vượt quá {self.capacity} byte")
+        readinto = getattr(stream, "readinto", None)
+        total = 0
+        with self._write_lock:
+            while length is None or total < length:
+                want = READ_BLOCK if length is None else min(READ_BLOCK, length - total)
+                if self.nbytes == self.capacity:
+                    if self.overflow == "reject":
+                        # Không biết trước độ dài: chỉ báo đầy nếu request còn dữ liệu
+                        if not stream.read(1):
+                            break
+                        raise BufferFull(f"Âm thanh vượt quá {self.capacity} byte")
+                    # Bỏ theo từng khối để không phải dồn mảng sau mỗi lần đọc nhỏ
+                    self._make_room(min(want, max(2, self.capacity // 4)))
+                want = min(want, self.capacity - self.nbytes)
+                dst = self._bytes[self.nbytes:self.nbytes + want]
+                if readinto is not None:
+                    n = readinto(memoryview(dst))
+                else:
+                    piece = stream.read(want)
+                    n = len(piece)
+                    dst[:n] = np.frombuffer(piece, dtype=np.uint8)
+                if not n:
+                    break
+                with self.lock:
+                    self.nbytes += n
+                total += n
+            if self.nbytes % 2:
+                print("Bỏ byte lẻ cuối body âm thanh")
+                with self.lock:
+                    self.nbytes -= 1
+                total -= 1
+        return total
+
+    def tail(self, nbytes):
+        # Bản sao nbytes byte mới nhất (cho VAD)
+        with self.lock:
+            nbytes = min(nbytes, self.nbytes)
+            return self._bytes[self.nbytes - nbytes:self.nbytes].tobytes()
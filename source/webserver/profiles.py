@@ -0,0 +1,161 @@
+# Định dạng âm thanh phản hồi riêng cho từng thiết bị: tần số lấy mẫu, số bit,
+# gói WAV hay PCM thô, nén IMA-ADPCM hay không, và kích thước khối (căn theo ibuf của I2S trên robot)
+# Server tổng hợp PCM 16 kHz/16-bit rồi chuyển sang đúng định dạng thiết bị ghi thẳng vào I2S.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import adpcm
+
+from audio_utils import resample, to_mono_float, pcm16_from_float, wav_bytes
+from config import SAMPLE_RATE
+
+RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000)
+BITS = (16, 32)             # I2S của MicroPython chỉ nhận 16 hoặc 32 bit
+CONTAINERS = ("wav", "raw")
+CODECS = ("pcm", "adpcm")
+ADPCM_ALIGN = 4096          # byte PCM sau giải mã của một khối ADPCM nếu thiết bị không khai align
+MAX_ALIGN = 64 * 1024
+
+
+class OutputProfile:
+    def __init__(self, rate=SAMPLE_RATE, bits=16, container="wav", align=0, codec="pcm"):
+        if rate not in RATES:
+            raise ValueError(f"rate phải là một trong {RATES}")
+        if bits not in BITS:
+            raise ValueError(f"bits phải là một trong {BITS}")
+        if container not in CONTAINERS:
+            raise ValueError(f"container phải là một trong {CONTAINERS}")
+        if codec not in CODECS:
+            raise ValueError(f"codec phải là một trong {CODECS}")
+        sampwidth = bits // 8
+        if not 0 <= align <= MAX_ALIGN or align % sampwidth:
+            raise ValueError(f"align phải trong [0, {MAX_ALIGN}] và chia hết cho {sampwidth}")
+        if codec == "adpcm":
+            # ADPCM luôn là 16 bit, gửi thô theo từng khối; align là số byte PCM
+            # sau khi robot giải mã một khối (thường bằng ibuf)
+            if bits != 16 or container != "raw":
+                raise ValueError("codec adpcm chỉ dùng với bits=16, container=raw")
+            align = align or ADPCM_ALIGN
+            if align % 4:
+                raise ValueError("align của adpcm phải chia hết cho 4")
+        self.rate = rate
+        self.bits = bits
+        self.container = container
+        self.codec = codec
+        self.sampwidth = sampwidth
+        # Dùng trong khóa bộ nhớ đệm TTS: mỗi định dạng có bản chuyển đổi riêng.
+        # ADPCM được mã hóa khi gửi (cả luồng một lần) nên dùng chung bản PCM 16 bit cùng tần số
+        self.format = f"pcm{bits}-{rate}-mono"
+        if codec == "adpcm":
+            self.samples_per_block = align // 2
+            self.block_bytes = adpcm.block_bytes(self.samples_per_block)
+        # Các chunk gửi đi dài đúng bội số của align (với ADPCM là nguyên khối)
+        self.align = self.block_bytes if codec == "adpcm" else align
+
+    @classmethod
+    def from_dict(cls, data):
+        codec = str(data.get("codec", "pcm"))
+        return cls(rate=int(data.get("rate", SAMPLE_RATE)), bits=int(data.get("bits", 16)),
+                   container=str(data.get("container", "raw" if codec == "adpcm" else "wav")),
+                   align=int(data.get("align", 0)), codec=codec)
+
+    def to_dict(self):
+        data = {"rate": self.rate, "bits": self.bits, "container": self.container,
+                "align": self.align, "codec": self.codec}
+        if self.codec == "adpcm":
+            data["align"] = self.samples_per_block * 2
+            data["block_bytes"] = self.block_bytes
+            data["samples_per_block"] = self.samples_per_block
+        return data
+
+    def convert(self, pcm):
+        # PCM int16 mono SAMPLE_RATE -> PCM của thiết bị (ADPCM được mã hóa sau, khi gửi)
+        if self.rate == SAMPLE_RATE and self.bits == 16:
+            return pcm
+        samples = np.frombuffer(pcm, dtype="<i2")
+        if self.rate != SAMPLE_RATE:
+            samples = np.frombuffer(pcm16_from_float(resample(to_mono_float(samples), SAMPLE_RATE, self.rate)),
+                                    dtype="<i2")
+        if self.bits == 32:
+            # Mẫu 16 bit đặt ở nửa cao của khung 32 bit như I2S yêu cầu
+            return (samples.astype("<i4") << 16).tobytes()
+        return samples.tobytes()
+
+    def pad(self, data):
+        # Thêm im lặng cho đủ bội số của align, thiết bị luôn ghi trọn một khối
+        if self.align and len(data) % self.align:
+            data += bytes(self.align - len(data) % self.align)
+        return data
+
+    def aligned(self, chunks):
+        # Gom lại các đoạn PCM thành khối đúng align byte (đoạn cuối được đệm im lặng).
+        # ADPCM: mã hóa cả luồng, chỉ khối cuối của phản hồi được đệm chứ không phải mỗi câu
+        if self.codec == "adpcm":
+            encoder = adpcm.BlockEncoder(self.samples_per_block)
+            for pcm in chunks:
+                data = encoder.encode(pcm)
+                if data:
+                    yield data
+            data = encoder.flush()
+            if data:
+                yield data
+            return
+        if not self.align:
+            yield from chunks
+            return
+        buf = bytearray()
+        for pcm in chunks:
+            buf += pcm
+            n = len(buf) - len(buf) % self.align
+            if n:
+                yield bytes(buf[:n])
+                del buf[:n]
+        if buf:
+            yield self.pad(bytes(buf))
+
+    def package(self, pcm):
+        # Toàn bộ phản hồi cho /get_audio_response và /wait_response
+        if self.container == "wav":
+            return wav_bytes(pcm, rate=self.rate, sampwidth=self.sampwidth)
+        if self.codec == "adpcm":
+            return adpcm.encode_blocks(pcm, self.samples_per_block)
+        return self.pad(pcm)
+
+    def content_type(self, stream=False):
+        if self.codec == "adpcm":
+            return f"audio/x-ima-adpcm; rate={self.rate}; channels=1; block={self.block_bytes}"
+        if self.container == "wav" and not stream:
+            return "audio/wav"
+        return f"audio/L{self.bits}; rate={self.rate}; channels=1"
+
+
+DEFAULT_PROFILE = OutputProfile()
+
+
+class ProfileRegistry:
+    # Định dạng đã đăng ký theo thiết bị, giữ cả khi phiên hết hạn (robot chỉ đăng ký lúc kết nối)
+    # nhưng có giới hạn: quá max_entries thì bỏ thiết bị lâu không dùng nhất
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def get(self, device_id, default=DEFAULT_PROFILE):
+        with self._lock:
+            profile = self._profiles.get(device_id)
+            if profile is None:
+                return default
+            self._profiles.move_to_end(device_id)
+            return profile
+
+    def set(self, device_id, profile):
+        with self._lock:
+            self._profiles[device_id] = profile
+            self._profiles.move_to_end(device_id)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
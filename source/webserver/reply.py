@@ -0,0 +1,56 @@
+# Âm thanh phản hồi được ghi dần theo từng câu trong lúc TTS còn đang tổng hợp
+# Client streaming có thể đọc và phát các câu đầu trong khi các câu sau chưa xong.
+import threading
+
+
+class ReplyStream:
+    def __init__(self, profile=None, action=None):
+        # Định dạng âm thanh của thiết bị lúc bắt đầu lượt nói (profiles.OutputProfile)
+        self.profile = profile
+        # Mã hành động robot tự thực hiện (intents.py), khi đó phản hồi không có âm thanh
+        self.action = action
+        self._chunks = []
+        self._closed = False
+        self.error = None
+        self.nbytes = 0
+        self._cond = threading.Condition()
+
+    def write(self, pcm):
+        if not pcm:
+            return
+        with self._cond:
+            self._chunks.append(pcm)
+            self.nbytes += len(pcm)
+            self._cond.notify_all()
+
+    def close(self, error=None):
+        with self._cond:
+            self._closed = True
+            self.error = error
+            self._cond.notify_all()
+
+    def complete(self):
+        return self._closed and self.error is None
+
+    def wait_closed(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self._closed, timeout)
+
+    def pcm(self):
+        # Toàn bộ PCM (chỉ dùng khi đã tổng hợp xong)
+        with self._cond:
+            return b"".join(self._chunks)
+
+    def chunks(self, timeout=30):
+        # Trả dần từng đoạn PCM ngay khi được ghi, kết thúc khi stream đóng
+        # hoặc quá timeout giây không có dữ liệu mới
+        i = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: i < len(self._chunks) or self._closed, timeout)
+                pending = self._chunks[i:]
+                i += len(pending)
+                if not pending:
+                    return
+            for pcm in pending:
+                yield pcm
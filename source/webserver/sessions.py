@@ -0,0 +1,139 @@
+# Quản lý phiên trò chuyện theo từng thiết bị cho ws.py
+# Mỗi robot có buffer âm thanh, trạng thái ready, lịch sử trò chuyện và
+# âm thanh phản hồi riêng, nên nhiều robot có thể dùng chung một server.
+import threading
+import time
+from collections import OrderedDict
+
+from reply import ReplyStream
+from vad import Endpointer
+from config import END_SILENCE_S
+
+
+class Session:
+    def __init__(self, device_id, new_transcriber, memory):
+        self.device_id = device_id
+        self.new_transcriber = new_transcriber
+        self.transcriber = new_transcriber()
+        self.endpointer = Endpointer(END_SILENCE_S)
+        self.auto_job = None    # job được VAD tự bắt đầu trước khi /end_audio tới
+        self.speech_started = False  # lượt nói hiện tại đã có tiếng nói (phản hồi cũ đã bị bỏ)
+        # Các lượt của cùng một phiên chạy lần lượt để lịch sử trò chuyện đúng thứ tự
+        self.turn_lock = threading.Lock()
+        self.reply = None       # ReplyStream: PCM 16 kHz mono int16 của câu trả lời
+        # Báo cho các request long-poll đang chờ khi có phản hồi mới
+        self._reply_cond = threading.Condition()
+        self.memory = memory    # ConversationMemory: lịch sử trò chuyện có giới hạn
+        self.chat = None        # phiên chat LLM dùng lại qua các lượt
+        self.chat_version = None
+        self.last_seen = time.monotonic()
+
+    def take_utterance(self):
+        # Tách lượt nói hiện tại ra, chunk mới (nếu có) sẽ vào transcriber mới
+        utterance, self.transcriber = self.transcriber, self.new_transcriber()
+        self.endpointer = Endpointer(END_SILENCE_S)
+        self.speech_started = False
+        return utterance
+
+    @property
+    def ready(self):
+        # 1 khi phản hồi đã tổng hợp xong và chưa được lấy
+        reply = self.reply
+        return 1 if reply is not None and reply.complete() else 0
+
+    def new_reply(self, profile=None, action=None):
+        # Bắt đầu phản hồi mới và đánh thức các request long-poll đang chờ
+        reply = ReplyStream(profile, action)
+        with self._reply_cond:
+            self.reply = reply
+            self._reply_cond.notify_all()
+        return reply
+
+    def discard_reply(self):
+        with self._reply_cond:
+            self.reply = None
+
+    def return_reply(self, reply):
+        # Trả lại phản hồi đã lấy mà chưa gửi được, trừ khi đã có phản hồi mới hơn
+        with self._reply_cond:
+            if self.reply is None:
+                self.reply = reply
+                self._reply_cond.notify_all()
+
+    def take_reply(self, timeout=0, stream=False):
+        # Lấy phản hồi (chờ tối đa timeout giây), mỗi phản hồi chỉ được lấy một lần.
+        # stream=True: trả về ReplyStream ngay khi có câu đầu tiên đang tổng hợp;
+        # stream=False: chỉ trả về khi đã tổng hợp xong (đọc toàn bộ PCM bằng reply.pcm()).
+        deadline = time.monotonic() + timeout
+        with self._reply_cond:
+            if timeout:
+                self._reply_cond.wait_for(lambda: self.reply is not None, timeout)
+            reply = self.reply
+        if reply is None:
+            return None
+        if not stream and not reply.wait_closed(max(0, deadline - time.monotonic())):
+            return None
+        with self._reply_cond:
+            if self.reply is not reply:
+                return None  # request khác đã lấy mất
+            self.reply = None
+        if stream or reply.complete():
+            return reply
+        return None
+
+    def close(self):
+        self.transcriber.close()
+
+    def memory_bytes(self):
+        size = len(self.transcriber)
+        if self.reply is not None:
+            size += self.reply.nbytes
+        return size
+
+
+class SessionRegistry:
+    def __init__(self, factory, ttl_s=1800, max_sessions=64, max_bytes=256 * 1024 * 1024):
+        self.factory = factory  # hàm: device_id -> Session mới
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # sắp theo lần truy cập gần nhất
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, device_id):
+        with self._lock:
+            session = self._sessions.get(device_id)
+            if session is None:
+                session = self.factory(device_id)
+                self._sessions[device_id] = session
+                print(f"Tạo phiên mới cho thiết bị {device_id}")
+            else:
+                self._sessions.move_to_end(device_id)
+            session.last_seen = time.monotonic()
+            self._evict()
+            return session
+
+    def _evict(self):
+        # Xóa các phiên hết hạn, sau đó xóa phiên ít dùng nhất nếu vượt giới hạn.
+        # Phiên vừa được truy cập luôn nằm cuối nên không bao giờ bị xóa ở đây.
+        now = time.monotonic()
+        for device_id in list(self._sessions):
+            if now - self._sessions[device_id].last_seen <= self.ttl_s:
+                break
+            self._drop(device_id, "hết hạn")
+
+        total = sum(s.memory_bytes() for s in self._sessions.values())
+        while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or total > self.max_bytes):
+            device_id = next(iter(self._sessions))
+            total -= self._sessions[device_id].memory_bytes()
+            self._drop(device_id, "vượt giới hạn")
+
+    def _drop(self, device_id, reason):
+        session = self._sessions.pop(device_id)
+        # Không chờ luồng nhận diện trong lúc giữ khóa của registry
+        threading.Thread(target=session.close, daemon=True).start()
+        print(f"Xóa phiên của thiết bị {device_id} ({reason})")
@@ -0,0 +1,47 @@
+# Khởi động server ws.py: nạp mô hình trong luồng nền, chạy thử (warm-up) và ghi lại
+# thời gian từng bước. Flask nhận request ngay, /readyz báo khi nào server sẵn sàng.
+import threading
+import time
+
+
+class Startup:
+    def __init__(self):
+        self.steps = []          # [(tên bước, số giây)]
+        self.error = None
+        self.ready = threading.Event()
+        self._begin = time.monotonic()
+        self.total_s = None
+
+    def start(self, steps):
+        # steps: list (tên, hàm) chạy lần lượt trong một luồng nền
+        threading.Thread(target=self._run, args=(steps,), name="startup", daemon=True).start()
+
+    def wait(self):
+        # Chặn tới khi khởi động xong, báo lỗi nếu khởi động thất bại
+        while not self.ready.wait(0.5):
+            if self.error is not None:
+                raise RuntimeError("Server khởi động lỗi: " + self.error)
+
+    def _run(self, steps):
+        for name, fn in steps:
+            begin = time.monotonic()
+            try:
+                fn()
+            except Exception as e:
+                self.error = f"{name}: {e}"
+                print(f"[startup] Lỗi ở bước {name}:", e)
+                return
+            elapsed = time.monotonic() - begin
+            self.steps.append((name, elapsed))
+            print(f"[startup] {name}: {elapsed:.2f}s")
+        self.total_s = time.monotonic() - self._begin
+        print(f"[startup] Sẵn sàng sau {self.total_s:.2f}s")
+        self.ready.set()
+
+    def status(self):
+        return {
+            "ready": self.ready.is_set(),
+            "error": self.error,
+            "steps": {name: round(seconds, 3) for name, seconds in self.steps},
+            "total_s": round(self.total_s, 3) if self.total_s is not None else None,
+        }
@@ -0,0 +1,122 @@
+# Chuyển văn bản thành giọng nói cho ws.py, toàn bộ xử lý trong bộ nhớ
+import io
+import re
+import threading
+
+import numpy as np
+
+from audio_utils import pcm16_from_float, postprocess
+from config import SAMPLE_RATE
+from metrics import STAGE_SECONDS
+
+SPEED = 1.5  # tăng tốc giọng đọc của gTTS cho tự nhiên hơn
+# Câu ngắn hơn số ký tự này được gộp với câu sau để đỡ một lần gọi TTS
+MIN_SENTENCE_CHARS = 20
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…;:])\s+|\n+")
+
+
+class SentenceSplitter:
+    # Tách dần luồng văn bản từ LLM thành các câu hoàn chỉnh để đưa sang TTS ngay.
+    # Câu quá ngắn được gộp với câu sau để đỡ một lần gọi TTS.
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for m in _SENTENCE_END.finditer(self.buffer):
+            head = self.buffer[start:m.start()].strip()
+            if len(head) >= MIN_SENTENCE_CHARS:
+                sentences.append(head)
+                start = m.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        # Phần còn lại khi LLM đã sinh xong
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class GttsBackend:
+    # gTTS: chất lượng tốt nhưng mỗi câu là một lượt gọi HTTPS ra Google,
+    # mất mạng là không nói được
+    def __init__(self, lang="vi", speed=SPEED):
+        self.lang = lang
+        self.speed = speed
+        # Khóa bộ nhớ đệm ghi rõ cách tăng tốc, âm thanh cũ (đổi cao độ qua pydub) không bị dùng lại
+        self.voice = f"gtts-{lang}-wsola-x{speed}"
+
+    def load(self):
+        # Nạp các thư viện TTS trong luồng khởi động thay vì lúc import ws.py
+        import miniaudio
+        import gtts
+        import scipy.signal
+
+    def synthesize(self, text):
+        import miniaudio
+        from gtts import gTTS
+
+        with STAGE_SECONDS.time(stage="tts"):
+            # gTTS trả về MP3, ghi thẳng vào bộ nhớ thay vì response_audio.mp3
+            mp3 = io.BytesIO()
+            gTTS(text, lang=self.lang).write_to_fp(mp3)
+
+            # Giải mã MP3 ngay trong tiến trình (miniaudio), không gọi ffmpeg
+            decoded = miniaudio.decode(mp3.getvalue(), output_format=miniaudio.SampleFormat.SIGNED16)
+
+        with STAGE_SECONDS.time(stage="resample"):
+            # Trộn mono, resample về 16 kHz và tăng tốc giữ cao độ, tất cả trên mảng NumPy
+            samples = np.frombuffer(decoded.samples, dtype=np.int16)
+            return postprocess(samples, decoded.sample_rate, decoded.nchannels, speed=self.speed)
+
+
+class MmsBackend:
+    # MMS-TTS (VITS) chạy cục bộ trên CPU qua transformers: không cần Internet,
+    # mô hình tiếng Việt xuất thẳng 16 kHz mono nên không phải resample
+    def __init__(self, model_name="facebook/mms-tts-vie", speed=1.0):
+        self.model_name = model_name
+        self.speed = speed
+        self.voice = f"mms-{model_name.rsplit('/', 1)[-1]}-x{speed}"
+        self.model = None
+        self.tokenizer = None
+        # Một mô hình dùng chung cho mọi phiên, gọi lần lượt
+        self.lock = threading.Lock()
+
+    def load(self):
+        from transformers import AutoTokenizer, VitsModel
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = VitsModel.from_pretrained(self.model_name)
+        self.model.eval()
+        # VITS đổi tốc độ bằng độ dài âm vị nên giữ nguyên cao độ
+        self.model.speaking_rate = self.speed
+        if self.model.config.sampling_rate != SAMPLE_RATE:
+            raise ValueError(f"{self.model_name} xuất {self.model.config.sampling_rate} Hz, cần {SAMPLE_RATE} Hz")
+        # Chạy thử một câu để lượt nói đầu tiên không phải chờ khởi tạo
+        self.synthesize("xin chào")
+
+    def synthesize(self, text):
+        import torch
+
+        with STAGE_SECONDS.time(stage="tts"):
+            inputs = self.tokenizer(text, return_tensors="pt")
+            with self.lock, torch.inference_mode():
+                waveform = self.model(**inputs).waveform[0].numpy()
+            return pcm16_from_float(waveform)
+
+
+TTS_BACKENDS = {
+    "gtts": GttsBackend,
+    "mms": MmsBackend,
+}
+
+
+def create_backend(name, model_name=None):
+    # Chọn engine TTS theo cấu hình (TTS_BACKEND)
+    if name not in TTS_BACKENDS:
+        raise ValueError(f"TTS_BACKEND không hợp lệ: {name} (chọn một trong {', '.join(TTS_BACKENDS)})")
+    if name == "mms":
+        return MmsBackend(model_name or "facebook/mms-tts-vie")
+    return TTS_BACKENDS[name]()
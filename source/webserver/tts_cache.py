@@ -0,0 +1,105 @@
+# Bộ nhớ đệm cho kết quả TTS, khóa theo nội dung câu (đã chuẩn hóa), giọng đọc và định dạng
+# Lưu PCM đã sẵn sàng gửi cho thiết bị trong RAM (LRU) và tùy chọn thêm một bản trên đĩa.
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    # Các câu chỉ khác nhau về hoa/thường hay khoảng trắng cho ra cùng một giọng đọc
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split()).lower()
+
+
+class TtsCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice, fmt):
+        data = "\0".join((normalize_text(text), voice, fmt))
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    def get(self, key, count=True):
+        # count=False: tra cứu phụ (vd. bản gốc khi đổi định dạng), không tính vào hits/misses
+        with self._lock:
+            pcm = self._items.get(key)
+            if pcm is not None:
+                self._items.move_to_end(key)
+                self.hits += count
+                return pcm
+        pcm = self._read_disk(key)
+        with self._lock:
+            if pcm is None:
+                self.misses += count
+                return None
+            self.hits += count
+            self.disk_hits += count
+        self._put_memory(key, pcm)
+        return pcm
+
+    def put(self, key, pcm):
+        self._put_memory(key, pcm)
+        self._write_disk(key, pcm)
+
+    def _put_memory(self, key, pcm):
+        if len(pcm) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = pcm
+            self._bytes += len(pcm)
+            # Bỏ các mục ít dùng nhất cho tới khi nằm trong giới hạn
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".pcm")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, pcm):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Ghi file tạm rồi đổi tên để không bao giờ đọc phải file ghi dở
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp, path)
+        except OSError as e:
+            print("Lỗi ghi bộ nhớ đệm TTS:", e)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,52 @@
+# Upload âm thanh micro trong một request duy nhất cho mỗi lượt nói (/stream_audio)
+# Body (thường gửi bằng HTTP chunked) là chuỗi các khung:
+#   4 byte số thứ tự (uint32 LE) + 2 byte độ dài (uint16 LE) + dữ liệu PCM 16 kHz/16-bit
+# Khung độ dài 0 báo hết câu nói. Khung bị thiết bị bỏ qua (số thứ tự nhảy cóc)
+# được bù bằng im lặng để giữ đúng thời gian cho VAD.
+import struct
+
+HEADER = struct.Struct("<IH")
+MAX_GAP_FRAMES = 16  # nhảy cóc quá xa thì coi như dữ liệu hỏng, không bù im lặng
+
+
+class FrameError(ValueError):
+    pass
+
+
+def _read_exact(stream, n):
+    data = b""
+    while len(data) < n:
+        part = stream.read(n - len(data))
+        if not part:
+            break
+        data += part
+    return data
+
+
+def read_frames(stream):
+    # Đọc dần từng khung từ request.stream, trả về (seq, pcm, số khung bị mất trước đó)
+    # Dừng ở khung kết thúc hoặc khi body hết
+    expected = 0
+    last_len = 0
+    while True:
+        header = _read_exact(stream, HEADER.size)
+        if not header:
+            return
+        if len(header) < HEADER.size:
+            raise FrameError("Khung bị cắt ở phần header")
+        seq, length = HEADER.unpack(header)
+        if length == 0:
+            return
+        pcm = _read_exact(stream, length)
+        if len(pcm) < length or length % 2:
+            raise FrameError(f"Khung {seq} không hợp lệ")
+        if seq < expected:
+            continue  # khung gửi lặp, bỏ qua
+        missing = seq - expected
+        if missing > MAX_GAP_FRAMES:
+            raise FrameError(f"Mất {missing} khung trước khung {seq}")
+        if missing:
+            pcm = bytes(missing * (last_len or length)) + pcm
+        expected = seq + 1
+        last_len = length
+        yield seq, pcm, missing
@@ -0,0 +1,105 @@
+# Phát hiện giọng nói (VAD) cho ws.py, tính vector hóa bằng NumPy trên các khung 20 ms
+# Một khung được xem là có tiếng nói khi năng lượng đủ cao so với nền nhiễu và phổ
+# không "phẳng" như tiếng ồn (spectral flatness thấp), hoặc năng lượng rất cao.
+import numpy as np
+
+from config import SAMPLE_RATE
+
+FRAME = SAMPLE_RATE // 50          # 20 ms
+NOISE_FLOOR_MAX_DB = -45.0         # nền nhiễu không bao giờ được coi là cao hơn mức này
+NOISE_FLOOR_MIN_DB = -70.0         # ...và không thấp hơn mức này (micro thật luôn có nhiễu)
+DIGITAL_SILENCE_DB = -90.0         # khung toàn số 0 (micro vừa bật, khung mất được bù 0 ở uplink.py)
+SPEECH_MARGIN_DB = 12.0            # tiếng nói phải cao hơn nền nhiễu ít nhất chừng này
+LOUD_MARGIN_DB = 22.0              # cao hơn mức này thì luôn là tiếng nói (kể cả âm gió s, x)
+FLATNESS_MAX = 0.45                # tiếng nói hữu thanh có phổ ít phẳng hơn tiếng ồn
+HANGOVER_FRAMES = 5                # nối các khoảng lặng ngắn giữa các từ (100 ms)
+
+_WINDOW = np.hanning(FRAME).astype(np.float32)
+
+
+def _frames(samples):
+    n = len(samples) // FRAME
+    return samples[:n * FRAME].reshape(n, FRAME)
+
+
+def frame_features(frames):
+    # Năng lượng (dBFS) và độ phẳng phổ của từng khung
+    energy = np.mean(np.square(frames), axis=1)
+    energy_db = 10.0 * np.log10(energy + 1e-10)
+    power = np.square(np.abs(np.fft.rfft(frames * _WINDOW, axis=1))) + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, flatness
+
+
+def noise_floor(energy_db):
+    # Khung toàn số 0 không phải nhiễu phòng: tính vào sẽ kéo nền xuống ~-100 dB và mọi
+    # tiếng ồn nhỏ đều thành "tiếng nói". Trả về None nếu không còn khung nào để ước lượng
+    live = energy_db[energy_db > DIGITAL_SILENCE_DB]
+    if len(live) == 0:
+        return None
+    return min(max(float(np.percentile(live, 10)), NOISE_FLOOR_MIN_DB), NOISE_FLOOR_MAX_DB)
+
+
+def is_speech(energy_db, flatness, floor_db):
+    voiced = (energy_db > floor_db + SPEECH_MARGIN_DB) & (flatness < FLATNESS_MAX)
+    return voiced | (energy_db > floor_db + LOUD_MARGIN_DB)
+
+
+def speech_mask(samples):
+    # Mặt nạ tiếng nói theo khung, đã nối các khoảng lặng ngắn
+    frames = _frames(samples)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    energy_db, flatness = frame_features(frames)
+    floor_db = noise_floor(energy_db)
+    mask = is_speech(energy_db, flatness, NOISE_FLOOR_MAX_DB if floor_db is None else floor_db)
+    kernel = np.ones(2 * HANGOVER_FRAMES + 1)
+    return np.convolve(mask.astype(np.float32), kernel, mode="same") > 0
+
+
+def trim_silence(samples, pad_s=0.2):
+    # Cắt khoảng lặng đầu và cuối (giữ lại pad_s giây mỗi bên), trả mảng rỗng nếu không có tiếng nói
+    mask = speech_mask(samples)
+    voiced = np.flatnonzero(mask)
+    if len(voiced) == 0:
+        return samples[:0]
+    pad = int(pad_s * SAMPLE_RATE)
+    start = max(0, voiced[0] * FRAME - pad)
+    end = min(len(samples), (voiced[-1] + 1) * FRAME + pad)
+    return samples[start:end]
+
+
+def has_speech(samples):
+    return bool(speech_mask(samples).any())
+
+
+class Endpointer:
+    # Tự phát hiện kết thúc câu nói từ các chunk đang tới: đã có đủ tiếng nói
+    # và sau đó im lặng liên tục ít nhất end_silence_s giây
+    def __init__(self, end_silence_s=0.8, min_speech_s=0.3):
+        self.end_frames = int(end_silence_s * SAMPLE_RATE) // FRAME
+        self.min_speech_frames = int(min_speech_s * SAMPLE_RATE) // FRAME
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.floor_db = NOISE_FLOOR_MAX_DB
+        self._rest = b""
+
+    def feed(self, chunk):
+        data = self._rest + bytes(chunk)
+        n = len(data) // (FRAME * 2)
+        self._rest = data[n * FRAME * 2:]
+        if n == 0:
+            return False
+        samples = np.frombuffer(data[:n * FRAME * 2], dtype=np.int16).astype(np.float32) / 32768.0
+        energy_db, flatness = frame_features(samples.reshape(n, FRAME))
+        floor_db = noise_floor(energy_db)
+        if floor_db is not None:
+            self.floor_db = min(self.floor_db, floor_db)
+        voiced = np.flatnonzero(is_speech(energy_db, flatness, self.floor_db))
+        if len(voiced):
+            self.speech_frames += len(voiced)
+            self.silence_frames = n - 1 - int(voiced[-1])
+        else:
+            self.silence_frames += n
+        return (self.speech_frames >= self.min_speech_frames
+                and self.silence_frames >= self.end_frames)
@@ -0,0 +1,215 @@
+# Kênh thoại hai chiều qua TCP: thiết bị giữ một kết nối cho mọi lượt nói, thay cho
+# /send_audio_chunk, /end_audio, /get_ready, /get_audio_response, /reset_session và long-poll.
+# Mỗi khung: 1 byte loại + 2 byte độ dài (uint16 LE) + dữ liệu.
+# Client MicroPython tương ứng: controller/voice_link.py và robot/voice_link.py
+import json
+import socket
+import socketserver
+import struct
+import threading
+
+HEADER = struct.Struct("<BH")
+MAX_PAYLOAD = 0xFFFF
+
+# Thiết bị -> server
+HELLO = 0x01       # JSON {"device": ..., "mic": bool, "speaker": bool, "profile": {...}}
+AUDIO = 0x02       # PCM 16 kHz/16-bit từ micro
+END = 0x03         # hết câu nói
+RESET = 0x04       # bắt đầu cuộc trò chuyện mới
+PING = 0x05
+# Server -> thiết bị
+EVENT = 0x81       # JSON {"event": "hello" | "accepted" | "busy" | "no_audio" | "reply" | "reset" | "error", ...}
+                   # "reply" có thể kèm "action": mã lệnh robot tự thực hiện, khi đó không có âm thanh
+REPLY_AUDIO = 0x82 # âm thanh phản hồi theo định dạng thiết bị đã đăng ký
+REPLY_END = 0x83   # hết phản hồi, JSON {"error": ...}
+PONG = 0x85
+
+REPLY_POLL_S = 5.0  # mỗi lần chờ phản hồi tối đa bao lâu trước khi kiểm tra lại kết nối
+# Phát hiện kết nối chết (robot mất điện, rớt WiFi) dù thiết bị không gửi gì giữa các lượt:
+# TCP keepalive sau KEEPALIVE_IDLE_S giây im lặng, dữ liệu gửi đi không được xác nhận
+# sau SEND_TIMEOUT_S giây thì hủy kết nối
+KEEPALIVE_IDLE_S = 30
+KEEPALIVE_INTERVAL_S = 10
+KEEPALIVE_COUNT = 3
+SEND_TIMEOUT_S = 30
+
+
+def _keepalive(sock):
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Các tùy chọn dưới đây không có trên mọi hệ điều hành
+    for name, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE_S), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL_S),
+                        ("TCP_KEEPCNT", KEEPALIVE_COUNT), ("TCP_USER_TIMEOUT", SEND_TIMEOUT_S * 1000)):
+        if hasattr(socket, name):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, name), value)
+
+
+class VoiceConnection:
+    def __init__(self, sock, server):
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        self.server = server
+        self.device_id = None
+        self.send_lock = threading.Lock()  # luồng đọc và luồng gửi phản hồi cùng ghi socket
+        self.closed = threading.Event()
+        _keepalive(sock)
+
+    def send(self, kind, payload=b""):
+        if len(payload) > MAX_PAYLOAD:
+            raise ValueError(f"Khung quá lớn: {len(payload)} > {MAX_PAYLOAD} byte")
+        with self.send_lock:
+            self.sock.sendall(HEADER.pack(kind, len(payload)))
+            if payload:
+                self.sock.sendall(payload)
+
+    def send_event(self, event, **data):
+        data["event"] = event
+        self.send(EVENT, json.dumps(data).encode())
+
+    def recv(self):
+        header = self.rfile.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None, None
+        kind, length = HEADER.unpack(header)
+        payload = self.rfile.read(length) if length else b""
+        if len(payload) < length:
+            return None, None
+        return kind, payload
+
+    def serve(self):
+        kind, payload = self.recv()
+        if kind != HELLO:
+            return
+        try:
+            hello = json.loads(payload)
+        except ValueError as e:
+            self.send_event("error", message=f"Invalid hello: {e}")
+            return
+        if not isinstance(hello, dict):
+            self.send_event("error", message="Invalid hello: expected a JSON object")
+            return
+        profile = hello.get("profile")
+        if profile is not None and not isinstance(profile, dict):
+            self.send_event("error", message="Invalid profile: expected a JSON object")
+            return
+        self.device_id = str(hello.get("device") or "default")
+        try:
+            profile = self.server.hello(self.device_id, profile)
+        except (TypeError, ValueError) as e:
+            self.send_event("error", message=f"Invalid profile: {e}")
+            return
+        self.send_event("hello", profile=profile)
+        print(f"[{self.device_id}] Kênh thoại đã kết nối")
+        if hello.get("speaker"):
+            self.server.register_speaker(self)
+            threading.Thread(target=self._push_replies, daemon=True).start()
+
+        while True:
+            kind, payload = self.recv()
+            if kind is None:
+                return
+            try:
+                if kind == AUDIO:
+                    self.server.audio(self.device_id, payload)
+                elif kind == END:
+                    result = self.server.end(self.device_id)
+                    self.send_event(result.pop("event"), **result)
+                elif kind == RESET:
+                    self.server.reset(self.device_id)
+                    self.send_event("reset")
+                elif kind == PING:
+                    self.send(PONG)
+            except OSError:
+                raise
+            except Exception as e:
+                print(f"[{self.device_id}] Lỗi kênh thoại:", e)
+                self.send_event("error", message=str(e))
+
+    def _push_replies(self):
+        # Gửi phản hồi ngay khi có câu đầu tiên, thiết bị không phải hỏi liên tục
+        try:
+            while not self.closed.is_set():
+                reply = self.server.take_reply(self.device_id, REPLY_POLL_S)
+                if reply is None:
+                    continue
+                if self.closed.is_set():
+                    # Kết nối đã đóng (hoặc đã có kết nối mới) trong lúc chờ: trả phản hồi lại
+                    # cho phiên để kết nối mới hoặc HTTP lấy
+                    self.server.return_reply(self.device_id, reply)
+                    break
+                profile = reply.profile
+                if reply.action:
+                    self.send_event("reply", profile=profile.to_dict(), action=reply.action)
+                    self.send(REPLY_END, json.dumps({"error": reply.error}).encode())
+                    continue
+                self.send_event("reply", profile=profile.to_dict())
+                # Chia khung theo bội số align để thiết bị luôn nhận trọn khối
+                step = profile.align * (60000 // profile.align) if profile.align else 60000
+                for chunk in profile.aligned(reply.chunks()):
+                    for start in range(0, len(chunk), step):
+                        self.send(REPLY_AUDIO, chunk[start:start + step])
+                self.send(REPLY_END, json.dumps({"error": reply.error}).encode())
+        except OSError:
+            pass
+
+    def shutdown(self):
+        # Ngắt kết nối từ luồng khác: luồng đọc đang chờ trong recv() sẽ thoát
+        self.closed.set()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self.closed.set()
+        if self.device_id:
+            self.server.unregister_speaker(self)
+            print(f"[{self.device_id}] Kênh thoại đã đóng")
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        conn = VoiceConnection(self.request, self.server)
+        try:
+            conn.serve()
+        except (OSError, ValueError) as e:
+            print("Kênh thoại ngắt:", e)
+        finally:
+            conn.close()
+
+
+class VoiceServer(socketserver.ThreadingTCPServer):
+    # Các hàm xử lý do ws.py cung cấp, đều nhận mã thiết bị:
+    #   hello(device_id, profile) -> dict profile, audio(device_id, pcm),
+    #   end(device_id) -> dict sự kiện, reset(device_id), take_reply(device_id, timeout) -> ReplyStream,
+    #   return_reply(device_id, reply): trả lại phản hồi chưa gửi được
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port, hello, audio, end, reset, take_reply, return_reply):
+        self.hello = hello
+        self.audio = audio
+        self.end = end
+        self.reset = reset
+        self.take_reply = take_reply
+        self.return_reply = return_reply
+        # Mỗi thiết bị chỉ một kết nối nhận phản hồi, kết nối mới thay kết nối cũ
+        self.speakers = {}
+        self.speakers_lock = threading.Lock()
+        super().__init__(("0.0.0.0", port), _Handler)
+
+    def register_speaker(self, conn):
+        with self.speakers_lock:
+            old = self.speakers.get(conn.device_id)
+            self.speakers[conn.device_id] = conn
+        if old is not None and old is not conn:
+            print(f"[{conn.device_id}] Kết nối kênh thoại mới, đóng kết nối cũ")
+            old.shutdown()
+
+    def unregister_speaker(self, conn):
+        with self.speakers_lock:
+            if self.speakers.get(conn.device_id) is conn:
+                del self.speakers[conn.device_id]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="voice-channel", daemon=True).start()
+        print(f"Kênh thoại TCP đang chạy trên cổng {self.server_address[1]}")